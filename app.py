@@ -3,12 +3,17 @@ import time  # Adicionando a importação de time
 import logging
 import json
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, Response, send_file
+from flask import Flask, request, jsonify, render_template, Response, send_file, url_for
 from dotenv import load_dotenv
 from dropbox import Dropbox
 from dropbox.exceptions import ApiError, AuthError
 from dropbox_handler import DropboxHandler
 from pdf_processor import PDFProcessor
+from watcher import FolderWatcher
+from jobs import JobManager
+from metadata_index import MetadataIndex
+from run_stats import RunHistory
+import metrics
 from logger import setup_logger, log_execution_end, get_logger, get_br_time
 from config import (
     DEBUG_FILES,
@@ -19,7 +24,13 @@ from config import (
     DROPBOX_PROCESSED_FOLDER_NAME,
     DROPBOX_SOURCE_PATH,
     DROPBOX_OUTPUT_PATH,
-    DROPBOX_PROCESSED_PATH
+    DROPBOX_PROCESSED_PATH,
+    WATCHER_ENABLED,
+    METADATA_INDEX_ENABLED,
+    METRICS_ENABLED,
+    STARTUP_WAIT_SECONDS,
+    STARTUP_RETRY_SECONDS,
+    SSE_HEARTBEAT_SECONDS
 )
 import threading
 import time
@@ -44,6 +55,24 @@ logger = setup_logger()
 # Initialize Dropbox handler - criar apenas uma instância global
 dropbox_handler = None
 pdf_processor = None  # Adiciona a inicialização de pdf_processor como None
+folder_watcher = None  # Observador opcional da pasta de origem
+
+# Índice local dos arquivos da pasta de origem; consultável sem acessar o Dropbox
+metadata_index = MetadataIndex() if METADATA_INDEX_ENABLED else None
+
+# Histórico das execuções, compartilhado entre os workers
+run_history = RunHistory()
+
+# Impede processamentos simultâneos neste processo
+_processing_lock = threading.Lock()
+
+# Inicialização deste processo: uma de cada vez, possivelmente em segundo plano
+_init_lock = threading.Lock()
+_init_thread_lock = threading.Lock()
+_init_thread = None
+_init_error = None
+_init_failed_at = None  # time.monotonic() da última falha, para espaçar as novas tentativas
+_ready = threading.Event()  # Dropbox e processador de PDF prontos
 
 # Caminho do arquivo de log
 LOG_FILE_PATH = 'workspace.log'
@@ -71,18 +100,17 @@ def init_dropbox():
     try:
         # Inicializar com refresh token
         logger.info("Inicializando Dropbox com refresh token")
-        dropbox_handler = DropboxHandler(app_key, app_secret, refresh_token)
+        handler = DropboxHandler(app_key, app_secret, refresh_token, validate=False)
         
-        # Verificar pastas necessárias no Dropbox
-        source_folder = dropbox_handler.get_source_folder_path()
-        output_folder = dropbox_handler.get_output_folder_path()
-        processed_folder = dropbox_handler.get_processed_folder_path()
+        # Verificar a conta e as pastas necessárias no Dropbox ao mesmo tempo
+        folders = handler.validate()
         
         # Verificar se todas as pastas foram encontradas
-        if not source_folder or not output_folder or not processed_folder:
+        if not folders.get('source') or not folders.get('output') or not folders.get('processed'):
             logger.error("Falha ao encontrar pastas necessárias no Dropbox")
             return False
         
+        dropbox_handler = handler
         logger.info("Dropbox inicializado com sucesso")
         return True
         
@@ -97,7 +125,7 @@ def init_pdf_processor():
     global pdf_processor
     
     try:
-        pdf_processor = PDFProcessor(dropbox_handler)
+        pdf_processor = PDFProcessor(dropbox_handler, metadata_index)
         logger.info("Processador de PDF inicializado com sucesso")
         return True
     except Exception as e:
@@ -209,9 +237,16 @@ def stream_logs():
         
         # Enviar mensagem de início
         yield f"data: {json.dumps({'event': 'connected', 'message': 'Conexão estabelecida'})}\n\n"
+        last_sent = time.monotonic()
         
         while True:
             try:
+                # Comentário SSE periódico: se o cliente desconectou, a escrita falha e a
+                # thread do servidor é liberada em vez de ficar presa esperando novos logs
+                if time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+                
                 if not os.path.exists(LOG_FILE_PATH):
                     time.sleep(1)
                     continue
@@ -228,6 +263,7 @@ def stream_logs():
                         for line in new_lines:
                             if line.strip():  # Ignorar linhas vazias
                                 yield f"data: {json.dumps({'log': line})}\n\n"
+                        last_sent = time.monotonic()
                     
                     last_position = current_position
                 
@@ -239,7 +275,11 @@ def stream_logs():
                 yield f"data: {json.dumps({'event': 'error', 'message': error_msg})}\n\n"
                 time.sleep(5)  # Esperar um pouco mais em caso de erro
     
-    return Response(generate(), mimetype='text/event-stream')
+    response = Response(generate(), mimetype='text/event-stream')
+    # Evita que proxies acumulem o stream antes de repassá-lo ao cliente
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/download-logs')
 def download_logs():
@@ -257,50 +297,332 @@ def download_logs():
                     as_attachment=True, 
                     download_name=f'logs-{datetime.now().strftime("%Y%m%d-%H%M%S")}.log')
 
+def ensure_initialized():
+    """
+    Inicialização lazy do Dropbox e do processador de PDF no worker atual.
+    
+    Returns:
+        str: Mensagem de erro, ou None se tudo estiver inicializado
+    """
+    with _init_lock:
+        if not dropbox_handler:
+            logger.info("Inicializando Dropbox no worker...")
+            if not init_dropbox():
+                return 'Não foi possível inicializar o Dropbox'
+        
+        if not pdf_processor:
+            logger.info("Inicializando PDF Processor no worker...")
+            if not init_pdf_processor():
+                return 'Não foi possível inicializar o PDF Processor'
+    
+    _ready.set()
+    return None
+
+def _background_init():
+    global _init_error, _init_failed_at
+    started = time.monotonic()
+    error = ensure_initialized()
+    # O erro da tentativa anterior só é substituído quando esta termina
+    _init_error = error
+    if error:
+        _init_failed_at = time.monotonic()
+        logger.error(f"Inicialização em segundo plano falhou: {error}. Nova tentativa em {STARTUP_RETRY_SECONDS:.0f}s")
+        return
+    _init_failed_at = None
+    logger.info(f"Serviço pronto em {time.monotonic() - started:.2f}s")
+    start_watcher()
+
+def start_background_init():
+    """
+    Inicializa o Dropbox e o processador de PDF em segundo plano, para que o
+    servidor comece a responder imediatamente; /ready indica quando terminou.
+    Não faz nada se já estiver pronto ou inicializando. Depois de uma falha, só
+    tenta de novo após STARTUP_RETRY_SECONDS.
+    
+    Returns:
+        threading.Thread: Thread da inicialização, ou None se já estiver pronto
+            ou aguardando para tentar de novo
+    """
+    global _init_thread
+    
+    if _ready.is_set():
+        return None
+    with _init_thread_lock:
+        if _init_thread is None or not _init_thread.is_alive():
+            if _init_failed_at is not None and time.monotonic() - _init_failed_at < STARTUP_RETRY_SECONDS:
+                return None
+            _init_thread = threading.Thread(target=_background_init, name="startup", daemon=True)
+            _init_thread.start()
+        return _init_thread
+
+def _initializing():
+    """Indica se há uma inicialização em segundo plano em andamento."""
+    thread = _init_thread
+    return thread is not None and thread.is_alive()
+
+def wait_ready(timeout=None):
+    """
+    Aguarda a inicialização, iniciando-a em segundo plano se necessário.
+    Retorna assim que a tentativa terminar, com sucesso ou não.
+    
+    Args:
+        timeout (float): Espera máxima em segundos (padrão: STARTUP_WAIT_SECONDS)
+    
+    Returns:
+        bool: True se o serviço está pronto
+    """
+    if _ready.is_set():
+        return True
+    thread = start_background_init()
+    if thread:
+        thread.join(STARTUP_WAIT_SECONDS if timeout is None else timeout)
+    return _ready.is_set()
+
+def before_fork():
+    """
+    Chamada no processo principal do gunicorn (com preload) antes de criar cada
+    worker: os workers herdam o Dropbox já inicializado, mas não as conexões
+    nem a thread de renovação do token.
+    """
+    if dropbox_handler:
+        dropbox_handler.before_fork()
+
+def after_fork():
+    """
+    Chamada em cada worker recém-criado: reinicia as conexões e threads do
+    processo e o observador de pasta. Um worker que não herdou a inicialização
+    (sem preload, ou se ela falhou no processo principal) a faz em segundo plano.
+    """
+    metrics.start_flusher()
+    if dropbox_handler:
+        try:
+            dropbox_handler.after_fork()
+        except Exception as e:
+            # O token herdado ainda é renovado pelo SDK quando expirar
+            logger.warning(f"Falha ao preparar o Dropbox no worker: {str(e)}")
+    if _ready.is_set():
+        start_watcher()
+    else:
+        start_background_init()
+
+def run_processing(progress=None):
+    """
+    Executa um processamento completo dos PDFs do Dropbox.
+    Deve ser chamada com _processing_lock adquirido.
+    
+    Args:
+        progress: Rastreador de progresso opcional (jobs.Job)
+    
+    Returns:
+        dict: Estatísticas do processamento, ou None em caso de falha
+    """
+    logger.info("INÍCIO PROCESSAMENTO")
+    started_at = datetime.now().isoformat(timespec='seconds')
+    
+    # Buscar e processar arquivos PDF
+    success = pdf_processor.process_pdfs_from_dropbox(progress=progress)
+    result = pdf_processor.get_processing_stats()
+    _record_run(started_at, success, result)
+    if not success:
+        return None
+    
+    # Log resumido do resultado
+    total_processed = sum(result['processed_cpfs'].values())
+    total_skipped = result['skipped_cpfs']
+    logger.info(f"Processamento concluído: {total_processed} CPFs processados, {total_skipped} ignorados. Total de arquivos: {result['total_files']}")
+    
+    # Incluir detalhes dos CPFs processados no log
+    if result['processed_cpfs']:
+        cpfs_list = ", ".join(result['processed_cpfs'].keys())
+        logger.info(f"CPFs processados: {cpfs_list}")
+    
+    logger.info("FIM PROCESSAMENTO")
+    return result
+
+def _record_run(started_at, success, result):
+    """
+    Grava a execução no histórico consultado por GET /runs.
+    """
+    run_history.append({
+        'started_at': started_at,
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'success': success,
+        'total_files': result['total_files'],
+        'processed_cpfs': len(result['processed_cpfs']),
+        'processed_files': result['total_processed'],
+        'skipped_cpfs': result['skipped_cpfs'],
+        'skipped_uploads': result['skipped_uploads'],
+        'timings': result['timings']
+    })
+
+def _run_job(job):
+    """
+    Executa um job de processamento enfileirado pelo JobManager.
+    
+    Returns:
+        dict: Estatísticas do processamento
+    """
+    error = ensure_initialized()
+    if error:
+        raise RuntimeError(error)
+    
+    job.update(stage='waiting')
+    with _processing_lock:
+        result = run_processing(progress=job)
+    
+    if result is None:
+        raise RuntimeError('Falha ao processar PDFs')
+    return result
+
+# Jobs de processamento executados em segundo plano
+job_manager = JobManager(_run_job)
+
+def _process_from_watcher():
+    """
+    Callback do observador de pasta: dispara um job de processamento.
+    
+    Returns:
+        bool: False se a fila estiver cheia e o disparo precisar ser repetido
+    """
+    job_id, attached = job_manager.submit()
+    if job_id is None:
+        logger.info("Fila de processamento cheia; observador aguardará para disparar novamente")
+        return False
+    return True
+
+def start_watcher():
+    """
+    Inicia o observador da pasta de origem, se WATCHER_ENABLED estiver ativo.
+    
+    Returns:
+        bool: True se o observador está rodando neste processo
+    """
+    global folder_watcher
+    
+    if not WATCHER_ENABLED or not dropbox_handler:
+        return False
+    
+    if not folder_watcher:
+        folder_watcher = FolderWatcher(dropbox_handler, _process_from_watcher)
+    return folder_watcher.start()
+
 @app.route("/process-pdfs", methods=["POST"])
 def process_pdfs():
-    global dropbox_handler, pdf_processor
-    
+    """
+    Enfileira um processamento e retorna 202 com o id do job.
+    Com ?wait=true, aguarda o término do job e retorna as estatísticas.
+    """
     # Verificar API Key
     if not check_api_key():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    # Inicialização lazy
-    if not dropbox_handler:
-        logger.info("Inicializando Dropbox no worker...")
-        if not init_dropbox():
-            return jsonify({'error': 'Não foi possível inicializar o Dropbox'}), 500
+    # Inicialização lazy, em segundo plano: enquanto não terminar, o cliente tenta de novo
+    if not wait_ready():
+        if _init_error and not _initializing():
+            return jsonify({'error': _init_error}), 500
+        response = jsonify({'error': 'Serviço inicializando. Tente novamente em instantes'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    # Um disparo com processamento em andamento é anexado a ele ou ao próximo da fila
+    job_id, attached = job_manager.submit()
+    if job_id is None:
+        return jsonify({'error': 'Fila de processamento cheia. Tente novamente mais tarde'}), 503
+    
+    if request.args.get('wait', '').lower() in ('1', 'true', 'yes'):
+        status = job_manager.wait(job_id)
+        if not status or status['status'] != 'succeeded':
+            error = (status or {}).get('error') or 'Falha ao processar PDFs'
+            return jsonify({'error': error}), 500
+        return jsonify(status['result']), 200
+    
+    return jsonify({
+        'job_id': job_id,
+        'attached': attached,
+        'status_url': url_for('get_job', job_id=job_id)
+    }), 202
+
+@app.route("/ready")
+def ready():
+    """
+    Indica se o Dropbox e o processador de PDF estão prontos neste worker, com
+    o erro da última tentativa. Inicia a inicialização em segundo plano se ainda
+    não começou (ou, após uma falha, se já passou STARTUP_RETRY_SECONDS).
+    """
+    if wait_ready(timeout=0):
+        return jsonify({'ready': True}), 200
+    return jsonify({'ready': False, 'error': _init_error}), 503
+
+@app.route("/jobs/<job_id>")
+def get_job(job_id):
+    """
+    Retorna o estado e o progresso de um job de processamento.
+    """
+    if not check_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    status = job_manager.get_status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    
+    return jsonify(status), 200
+
+@app.route("/pending/<cpf>")
+def get_pending(cpf):
+    """
+    Retorna os arquivos de um CPF que ainda não foram movidos para a pasta de
+    processados, segundo o índice local (sem consultar o Dropbox).
+    """
+    if not check_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if metadata_index is None:
+        return jsonify({'error': 'Índice de metadados desativado'}), 404
+    
+    # Aceita o CPF com ou sem pontuação
+    digits = ''.join(c for c in cpf if c.isdigit())
+    if len(digits) != 11:
+        return jsonify({'error': 'CPF inválido'}), 400
     
-    if not pdf_processor:
-        logger.info("Inicializando PDF Processor no worker...")
-        if not init_pdf_processor():
-            return jsonify({'error': 'Não foi possível inicializar o PDF Processor'}), 500
+    files = metadata_index.pending_for(digits)
+    return jsonify({
+        'cpf': digits,
+        'count': len(files),
+        'files': files
+    }), 200
+
+@app.route("/runs")
+def get_runs():
+    """
+    Lista as execuções mais recentes (mais nova primeiro) com os tempos por
+    etapa, para comparar execuções e identificar regressões.
+    """
+    if not check_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        logger.info("INÍCIO PROCESSAMENTO")
-        
-        # Buscar e processar arquivos PDF
-        if not pdf_processor.process_pdfs_from_dropbox():
-            return jsonify({'error': 'Falha ao processar PDFs'}), 500
-        
-        result = pdf_processor.get_processing_stats()
-        
-        # Log resumido do resultado
-        total_processed = sum(result['processed_cpfs'].values())
-        total_skipped = result['skipped_cpfs']
-        logger.info(f"Processamento concluído: {total_processed} CPFs processados, {total_skipped} ignorados. Total de arquivos: {result['total_files']}")
-        
-        # Incluir detalhes dos CPFs processados no log
-        if result['processed_cpfs']:
-            cpfs_list = ", ".join(result['processed_cpfs'].keys())
-            logger.info(f"CPFs processados: {cpfs_list}")
-        
-        logger.info("FIM PROCESSAMENTO")
-        return jsonify(result), 200
-        
-    except Exception as e:
-        logger.error(f"Erro ao processar PDFs: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'limit deve ser um número inteiro'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit deve ser maior que zero'}), 400
+    
+    runs = run_history.recent(limit)
+    return jsonify({'count': len(runs), 'runs': runs}), 200
+
+@app.route("/metrics")
+def get_metrics():
+    """
+    Métricas das chamadas à API do Dropbox no formato de texto do Prometheus,
+    somadas entre todos os workers.
+    """
+    if not check_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Métricas desativadas'}), 404
+    
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.after_request
 def compress_response(response):
@@ -338,6 +660,8 @@ if __name__ == '__main__':
         logger.error(f"Falha em todas as {max_retries} tentativas de inicialização. Encerrando.")
         exit(1)
     
+    start_watcher()
+    
     # Iniciar servidor Flask
     port = int(os.environ.get('PORT', PORT))
     app.run(host='0.0.0.0', port=port, threaded=True)
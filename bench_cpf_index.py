@@ -0,0 +1,94 @@
+"""
+Micro-benchmark da extração e agrupamento de CPFs.
+
+Compara a extração original (re.search com o padrão em string a cada arquivo)
+com cpf_index.CPFIndex sobre uma listagem sintética.
+
+Uso:
+    python bench_cpf_index.py [quantidade_de_arquivos]
+"""
+import re
+import sys
+import time
+import random
+from cpf_index import CPFIndex, is_valid_cpf
+from file_entry import FileEntry
+
+
+def _random_cpf(rng):
+    while True:
+        cpf = f"{rng.randrange(10 ** 9):09d}"
+        for weights in (range(10, 1, -1), range(11, 1, -1)):
+            cpf += str(sum(int(d) * w for d, w in zip(cpf, weights)) * 10 % 11 % 10)
+        if is_valid_cpf(cpf):
+            return cpf
+
+
+def _make_entries(count, seed=42):
+    """Gera nomes de arquivos no formato dos comprovantes, com ruído realista."""
+    rng = random.Random(seed)
+    cpfs = [_random_cpf(rng) for _ in range(count // 4 or 1)]
+    entries = []
+    for i in range(count):
+        cpf = rng.choice(cpfs)
+        kind = i % 5
+        if kind == 0:
+            name = f"{cpf} - comprovante {i}.pdf"
+        elif kind == 1:
+            name = f"PAGAMENTO {cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}.pdf"
+        elif kind == 2:
+            name = f"tel 11987654321 cpf {cpf}.pdf"
+        elif kind == 3:
+            name = f"recibo 20250511 {cpf[:3]} {cpf[3:6]} {cpf[6:9]} {cpf[9:]}.pdf"
+        else:
+            name = f"documento sem cpf {i}.pdf"
+        entries.append(FileEntry(f"id:{i}", f"/COMPROVANTE DE PAGAMENTO/{name}", 100_000, f"{i:015x}", None, None))
+    return entries
+
+
+def _legacy_groups(entries):
+    """Agrupamento como era feito antes de cpf_index."""
+    groups = {}
+    for entry in entries:
+        cpf_pattern = r'\b(\d{3}[.\-\s]?\d{3}[.\-\s]?\d{3}[.\-\s]?\d{2}|\d{11})\b'
+        match = re.search(cpf_pattern, entry.name)
+        if match:
+            cpf = ''.join(c for c in match.group(1) if c.isdigit())
+            groups.setdefault(cpf, []).append(entry)
+    return groups
+
+
+def _best_of(func, repeat=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    entries = _make_entries(count)
+
+    legacy_time, legacy = _best_of(lambda: _legacy_groups(entries))
+
+    def build_index():
+        # Mede sem o cache de validação aquecido por uma rodada anterior
+        is_valid_cpf.cache_clear()
+        return CPFIndex(entries)
+
+    index_time, index = _best_of(build_index)
+
+    print(f"Arquivos: {count}")
+    largest_legacy = max(len(files) for files in legacy.values())
+    largest_index = max(index.counts().values())
+    print(f"Original:  {legacy_time * 1000:8.1f} ms  {len(legacy)} grupos, maior com {largest_legacy} arquivos")
+    print(f"CPFIndex:  {index_time * 1000:8.1f} ms  {len(index)} grupos, maior com {largest_index} arquivos, "
+          f"{index.unmatched} sem CPF válido")
+    print(f"Ganho:     {legacy_time / index_time:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import time
+import random
+import threading
+from logger import get_logger
+from config import (
+    DROPBOX_CONCURRENCY_INITIAL,
+    DROPBOX_CONCURRENCY_MIN,
+    DROPBOX_CONCURRENCY_MAX,
+    DROPBOX_CONCURRENCY_DECREASE,
+    RATE_LIMIT_BASE_DELAY,
+    RATE_LIMIT_MAX_DELAY
+)
+
+logger = get_logger()
+
+
+class ConcurrencyGovernor:
+    """
+    Limita as chamadas simultâneas à API do Dropbox e ajusta o limite conforme
+    o rate limit observado (AIMD).
+
+    Cada chamada concluída sem rate limit aumenta o limite em 1/limite (cerca de
+    uma chamada a mais por "rodada" de chamadas); um rate limit multiplica o
+    limite por DROPBOX_CONCURRENCY_DECREASE e suspende novas chamadas pelo
+    retry_after informado pelo Dropbox. Só a primeira chamada limitada de uma
+    rajada reduz o limite: as que já estavam em andamento quando o limite caiu
+    não o reduzem de novo.
+
+    Exemplo:
+        governor = ConcurrencyGovernor()
+        ticket = governor.acquire()
+        try:
+            ...
+        finally:
+            governor.release(ticket, throttled=False)
+    """
+
+    def __init__(self, initial=None, minimum=None, maximum=None, decrease=None):
+        """
+        Args:
+            initial (int): Limite inicial (padrão: DROPBOX_CONCURRENCY_INITIAL)
+            minimum (int): Limite mínimo (padrão: DROPBOX_CONCURRENCY_MIN)
+            maximum (int): Limite máximo (padrão: DROPBOX_CONCURRENCY_MAX)
+            decrease (float): Fator aplicado ao limite a cada rate limit (padrão: DROPBOX_CONCURRENCY_DECREASE)
+        """
+        self.minimum = max(1, DROPBOX_CONCURRENCY_MIN if minimum is None else minimum)
+        self.maximum = max(self.minimum, DROPBOX_CONCURRENCY_MAX if maximum is None else maximum)
+        initial = DROPBOX_CONCURRENCY_INITIAL if initial is None else initial
+        self.decrease = DROPBOX_CONCURRENCY_DECREASE if decrease is None else decrease
+        self._limit = float(min(self.maximum, max(self.minimum, initial)))
+        self._in_flight = 0
+        self._resume_at = 0.0       # Chamadas suspensas até este instante (retry_after)
+        self._last_decrease = 0.0   # Instante da última redução do limite
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """Número atual de chamadas simultâneas permitidas."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        """Chamadas em andamento."""
+        return self._in_flight
+
+    def acquire(self):
+        """
+        Aguarda uma vaga para uma chamada.
+
+        Returns:
+            float: Ticket a devolver em release (instante de início da chamada)
+        """
+        with self._condition:
+            while True:
+                wait = self._resume_at - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                elif self._in_flight >= int(self._limit):
+                    self._condition.wait()
+                else:
+                    break
+            self._in_flight += 1
+            return time.monotonic()
+
+    def release(self, ticket, throttled=False, retry_after=None, neutral=False):
+        """
+        Devolve a vaga de uma chamada e ajusta o limite.
+
+        Args:
+            ticket (float): Valor retornado por acquire
+            throttled (bool): Se a chamada recebeu rate limit
+            retry_after (float): Espera pedida pelo Dropbox, em segundos
+            neutral (bool): Se a chamada falhou por outro motivo (não altera o limite)
+        """
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if retry_after:
+                    self._resume_at = max(self._resume_at, now + retry_after)
+                if ticket >= self._last_decrease:
+                    previous = self.limit
+                    self._limit = max(self.minimum, self._limit * self.decrease)
+                    self._last_decrease = now
+                    logger.warning(f"Rate limit do Dropbox: chamadas simultâneas {previous} -> {self.limit}")
+            elif not neutral and self._limit < self.maximum:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Espera antes de repetir uma chamada que recebeu rate limit.
+
+    Respeita o retry_after do Dropbox e acrescenta um intervalo aleatório
+    (backoff exponencial com jitter), para que as chamadas suspensas juntas
+    não voltem todas no mesmo instante.
+
+    Args:
+        attempt (int): Número da nova tentativa (1 para a primeira)
+        retry_after (float): Espera pedida pelo Dropbox, se houver
+
+    Returns:
+        float: Segundos de espera
+    """
+    jitter = random.uniform(0, min(RATE_LIMIT_MAX_DELAY, RATE_LIMIT_BASE_DELAY * 2 ** (attempt - 1)))
+    if retry_after is None:
+        return jitter
+    return retry_after + jitter
@@ -4,6 +4,13 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+def _env_bool(name, default):
+    """Lê uma variável de ambiente booleana ("1", "true", "yes", "on")."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 # API Configuration
 API_SECRET = os.environ.get("API_SECRET", "")
 
@@ -37,4 +44,148 @@ DROPBOX_OUTPUT_PATH = f"{DROPBOX_BASE_FOLDER}/{DROPBOX_OUTPUT_FOLDER_NAME}"
 DROPBOX_PROCESSED_PATH = f"{DROPBOX_BASE_FOLDER}/{DROPBOX_PROCESSED_FOLDER_NAME}"
 
 # Configurações da aplicação
-PORT = 5000
\ No newline at end of file
+PORT = 5000
+
+# Diretório para arquivos de estado locais (cursores, caches, índices)
+STATE_DIR = os.environ.get("STATE_DIR", ".state")
+
+# Pipeline de processamento (download → merge → upload → move)
+# Quando ativo, os grupos de CPF passam por estágios concorrentes ligados por filas limitadas
+PIPELINE_ENABLED = _env_bool("PIPELINE_ENABLED", True)
+PIPELINE_DOWNLOAD_WORKERS = int(os.environ.get("PIPELINE_DOWNLOAD_WORKERS", 4))
+PIPELINE_MERGE_WORKERS = int(os.environ.get("PIPELINE_MERGE_WORKERS", 1))
+PIPELINE_UPLOAD_WORKERS = int(os.environ.get("PIPELINE_UPLOAD_WORKERS", 2))
+PIPELINE_MOVE_WORKERS = int(os.environ.get("PIPELINE_MOVE_WORKERS", 2))
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 4))  # Grupos em espera entre estágios
+
+# Downloads simultâneos dentro de um mesmo grupo de CPF (DropboxHandler.download_many)
+DOWNLOAD_MAX_WORKERS = int(os.environ.get("DOWNLOAD_MAX_WORKERS", 4))
+
+# Downloads são mantidos em memória até este tamanho e depois transbordam para disco
+DOWNLOAD_SPOOL_MAX_MEMORY = int(os.environ.get("DOWNLOAD_SPOOL_MAX_MEMORY", 8 * 1024 * 1024))  # 8MB
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("DOWNLOAD_CHUNK_SIZE", 64 * 1024))  # 64KB
+
+# Cache local de downloads, endereçado pelo content_hash do Dropbox (LRU limitado por tamanho)
+DOWNLOAD_CACHE_ENABLED = _env_bool("DOWNLOAD_CACHE_ENABLED", True)
+DOWNLOAD_CACHE_DIR = os.environ.get("DOWNLOAD_CACHE_DIR", os.path.join(STATE_DIR, "download_cache"))
+DOWNLOAD_CACHE_MAX_BYTES = int(os.environ.get("DOWNLOAD_CACHE_MAX_BYTES", 512 * 1024 * 1024))  # 512MB
+
+# União de PDFs: anotações (links, comentários) são descartadas a menos que MERGE_KEEP_ANNOTATIONS;
+# recursos idênticos entre comprovantes (fontes, logos, perfis ICC) são gravados uma única vez
+MERGE_KEEP_ANNOTATIONS = _env_bool("MERGE_KEEP_ANNOTATIONS", False)
+MERGE_DEDUP_RESOURCES = _env_bool("MERGE_DEDUP_RESOURCES", True)
+MERGE_COMPRESS_STREAMS = _env_bool("MERGE_COMPRESS_STREAMS", True)
+
+# Merge em processos separados (ProcessPoolExecutor), fora do GIL do worker. Cada worker do
+# servidor tem seu próprio pool: MERGE_PROCESS_WORKERS = 0 divide os núcleos entre os
+# SERVER_WORKERS workers (cpu_count // SERVER_WORKERS, mínimo 1; no Windows, um processo por núcleo)
+MERGE_USE_PROCESSES = _env_bool("MERGE_USE_PROCESSES", False)
+MERGE_PROCESS_WORKERS = int(os.environ.get("MERGE_PROCESS_WORKERS", 0))
+
+# Uploads acima deste tamanho usam sessão de upload em partes (limite do upload simples: 150MB)
+UPLOAD_SESSION_THRESHOLD = int(os.environ.get("UPLOAD_SESSION_THRESHOLD", 32 * 1024 * 1024))  # 32MB
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))  # 8MB
+UPLOAD_CHUNK_RETRIES = int(os.environ.get("UPLOAD_CHUNK_RETRIES", 3))  # Novas tentativas por parte
+
+# Movimentação em lote (files_move_batch_v2)
+MOVE_BATCH_SIZE = int(os.environ.get("MOVE_BATCH_SIZE", 1000))  # Máximo permitido pela API: 1000
+MOVE_BATCH_TIMEOUT = int(os.environ.get("MOVE_BATCH_TIMEOUT", 300))  # Segundos aguardando um lote assíncrono
+MOVE_FLUSH_GROUPS = int(os.environ.get("MOVE_FLUSH_GROUPS", 20))  # Grupos acumulados antes de enviar um lote
+
+# Listagem incremental: persiste o cursor de files_list_folder entre execuções
+LIST_INCREMENTAL = _env_bool("LIST_INCREMENTAL", True)
+LIST_STATE_FILE = os.path.join(STATE_DIR, "list_state.json")
+
+# Índice local (SQLite) dos arquivos da pasta de origem e do estado de processamento
+METADATA_INDEX_ENABLED = _env_bool("METADATA_INDEX_ENABLED", True)
+METADATA_INDEX_FILE = os.environ.get("METADATA_INDEX_FILE", os.path.join(STATE_DIR, "metadata.db"))
+
+# Histórico das últimas execuções (tempos por etapa e latência do Dropbox), exposto em GET /runs
+RUN_HISTORY_FILE = os.environ.get("RUN_HISTORY_FILE", os.path.join(STATE_DIR, "run_history.json"))
+RUN_HISTORY_SIZE = int(os.environ.get("RUN_HISTORY_SIZE", 100))
+
+# Métricas no formato do Prometheus (GET /metrics); cada processo grava seus valores em
+# METRICS_DIR e o endpoint soma os arquivos de todos os workers
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(STATE_DIR, "metrics"))
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))  # Segundos entre gravações dos valores alterados
+
+# Controle adaptativo das chamadas simultâneas ao Dropbox (AIMD): o limite cresce a cada
+# chamada bem-sucedida e é multiplicado por DROPBOX_CONCURRENCY_DECREASE a cada rate limit
+DROPBOX_CONCURRENCY_INITIAL = int(os.environ.get("DROPBOX_CONCURRENCY_INITIAL", 4))
+DROPBOX_CONCURRENCY_MIN = int(os.environ.get("DROPBOX_CONCURRENCY_MIN", 1))
+DROPBOX_CONCURRENCY_MAX = int(os.environ.get("DROPBOX_CONCURRENCY_MAX", 16))
+DROPBOX_CONCURRENCY_DECREASE = float(os.environ.get("DROPBOX_CONCURRENCY_DECREASE", 0.5))
+
+# Pools de conexões HTTP persistentes do cliente do Dropbox, um por tipo de endpoint;
+# dimensionados pela concorrência para que nenhuma conexão seja descartada após o uso
+HTTP_POOL_RPC_CONNECTIONS = int(os.environ.get("HTTP_POOL_RPC_CONNECTIONS", DROPBOX_CONCURRENCY_MAX))
+HTTP_POOL_CONTENT_CONNECTIONS = int(os.environ.get(
+    "HTTP_POOL_CONTENT_CONNECTIONS",
+    # O corpo de um download é lido depois que a chamada libera sua vaga no controle de concorrência
+    max(DROPBOX_CONCURRENCY_MAX, PIPELINE_DOWNLOAD_WORKERS * DOWNLOAD_MAX_WORKERS + PIPELINE_UPLOAD_WORKERS)
+))
+HTTP_POOL_NOTIFY_CONNECTIONS = int(os.environ.get("HTTP_POOL_NOTIFY_CONNECTIONS", 2))  # Longpoll do observador
+
+# Novas tentativas de chamadas que receberam rate limit: espera o retry_after do Dropbox mais
+# um intervalo aleatório de até RATE_LIMIT_BASE_DELAY * 2^tentativa (limitado a RATE_LIMIT_MAX_DELAY)
+RATE_LIMIT_MAX_RETRIES = int(os.environ.get("RATE_LIMIT_MAX_RETRIES", 8))
+RATE_LIMIT_BASE_DELAY = float(os.environ.get("RATE_LIMIT_BASE_DELAY", 1))
+RATE_LIMIT_MAX_DELAY = float(os.environ.get("RATE_LIMIT_MAX_DELAY", 60))
+
+# Cache do access token do Dropbox, compartilhado entre os workers; o token é renovado em
+# segundo plano TOKEN_REFRESH_MARGIN segundos antes de expirar (o SDK renova sozinho a 300s)
+TOKEN_CACHE_ENABLED = _env_bool("TOKEN_CACHE_ENABLED", True)
+TOKEN_CACHE_FILE = os.environ.get("TOKEN_CACHE_FILE", os.path.join(STATE_DIR, "token.json"))
+TOKEN_REFRESH_MARGIN = int(os.environ.get("TOKEN_REFRESH_MARGIN", 900))
+
+# Observador da pasta de origem (files_list_folder_longpoll)
+WATCHER_ENABLED = _env_bool("WATCHER_ENABLED", False)
+WATCHER_DEBOUNCE_SECONDS = float(os.environ.get("WATCHER_DEBOUNCE_SECONDS", 15))  # Silêncio antes de disparar
+WATCHER_MAX_DELAY_SECONDS = float(os.environ.get("WATCHER_MAX_DELAY_SECONDS", 120))  # Atraso máximo de um disparo
+WATCHER_LONGPOLL_TIMEOUT = int(os.environ.get("WATCHER_LONGPOLL_TIMEOUT", 60))  # Entre 30 e 480 segundos
+WATCHER_LOCK_FILE = os.path.join(STATE_DIR, "watcher.lock")
+WATCHER_LOCK_RETRY_SECONDS = float(os.environ.get("WATCHER_LOCK_RETRY_SECONDS", 30))  # Nova tentativa de assumir a observação
+
+# Tempo (segundos) que os caminhos das pastas resolvidas ficam em cache
+FOLDER_CACHE_TTL = int(os.environ.get("FOLDER_CACHE_TTL", 3600))
+
+# Inicialização: as pastas validadas por um processo ficam em STARTUP_STATE_FILE (por até
+# FOLDER_CACHE_TTL) e são reaproveitadas pelos demais workers sem chamadas ao Dropbox
+STARTUP_STATE_FILE = os.path.join(STATE_DIR, "startup.json")
+STARTUP_WAIT_SECONDS = float(os.environ.get("STARTUP_WAIT_SECONDS", 5))  # Espera de /process-pdfs pela inicialização
+STARTUP_RETRY_SECONDS = float(os.environ.get("STARTUP_RETRY_SECONDS", 30))  # Intervalo entre tentativas após uma falha
+
+# Busca de pastas (DropboxHandler.find_folder)
+FIND_FOLDER_MAX_WORKERS = int(os.environ.get("FIND_FOLDER_MAX_WORKERS", 8))  # Listagens simultâneas por nível
+FIND_FOLDER_SEARCH_RESULTS = int(os.environ.get("FIND_FOLDER_SEARCH_RESULTS", 100))  # Resultados por página da busca
+
+# Jobs assíncronos de processamento (POST /process-pdfs)
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", 1))  # Jobs executados ao mesmo tempo
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", 5))  # Jobs na fila antes de recusar novos
+JOB_HISTORY_SIZE = int(os.environ.get("JOB_HISTORY_SIZE", 50))  # Jobs concluídos mantidos para consulta
+
+# Coordenação entre processos: um único processamento por vez e no máximo um na fila
+JOBS_DIR = os.path.join(STATE_DIR, "jobs")  # Estado dos jobs, legível por qualquer worker
+RUN_LOCK_FILE = os.path.join(STATE_DIR, "run.lock")
+RUN_STATE_FILE = os.path.join(STATE_DIR, "run_state.json")
+RUN_STATE_LOCK_FILE = os.path.join(STATE_DIR, "run_state.lock")
+
+# Servidor de produção (serve.py). No Linux/Mac o Gunicorn roda com workers "gthread": cada
+# worker atende SERVER_THREADS requisições ao mesmo tempo, de modo que um processamento longo
+# ou um cliente de /stream-logs ocupa uma thread, e não o worker inteiro. Com SERVER_PRELOAD, o
+# processo principal importa o app e inicializa o Dropbox uma única vez antes de criar os workers
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 4))
+SERVER_WORKER_CLASS = os.environ.get("SERVER_WORKER_CLASS", "gthread")  # "gevent" exige o pacote gevent
+SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 16))  # Requisições simultâneas por worker
+SERVER_PRELOAD = _env_bool("SERVER_PRELOAD", True)
+SERVER_TIMEOUT = int(os.environ.get("SERVER_TIMEOUT", 120))  # Worker sem sinal de vida é reiniciado
+SERVER_GRACEFUL_TIMEOUT = int(os.environ.get("SERVER_GRACEFUL_TIMEOUT", 120))  # Espera das requisições em andamento num restart (HUP)
+SERVER_KEEPALIVE = int(os.environ.get("SERVER_KEEPALIVE", 5))  # Segundos de keep-alive entre requisições
+SERVER_MAX_REQUESTS = int(os.environ.get("SERVER_MAX_REQUESTS", 0))  # Recicla o worker após N requisições (0 = nunca)
+SERVER_MAX_REQUESTS_JITTER = int(os.environ.get("SERVER_MAX_REQUESTS_JITTER", 0))
+WAITRESS_THREADS = int(os.environ.get("WAITRESS_THREADS", 16))  # Threads do Waitress (Windows)
+
+# Intervalo (segundos) dos comentários de keep-alive de /stream-logs; detectam clientes desconectados
+# e liberam a thread que os atendia mesmo sem novas linhas de log
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
@@ -0,0 +1,58 @@
+import hashlib
+
+# Tamanho do bloco usado pelo Dropbox no cálculo do content_hash
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class ContentHasher:
+    """
+    Calcula o content_hash do Dropbox de forma incremental.
+
+    O arquivo é dividido em blocos de 4MB; o hash final é o SHA-256 da
+    concatenação dos SHA-256 de cada bloco.
+    """
+
+    def __init__(self):
+        self._overall = hashlib.sha256()
+        self._block = hashlib.sha256()
+        self._block_size = 0
+
+    def update(self, data):
+        """Acrescenta bytes ao conteúdo sendo calculado."""
+        view = memoryview(data)
+        while len(view):
+            if self._block_size == BLOCK_SIZE:
+                self._overall.update(self._block.digest())
+                self._block = hashlib.sha256()
+                self._block_size = 0
+            take = min(BLOCK_SIZE - self._block_size, len(view))
+            self._block.update(view[:take])
+            self._block_size += take
+            view = view[take:]
+
+    def hexdigest(self):
+        """Retorna o content_hash em hexadecimal (não altera o estado)."""
+        overall = self._overall.copy()
+        if self._block_size:
+            overall.update(self._block.digest())
+        return overall.hexdigest()
+
+
+def compute_content_hash(file_obj, chunk_size=1024 * 1024):
+    """
+    Calcula o content_hash do Dropbox de um arquivo aberto, preservando a posição atual.
+
+    Args:
+        file_obj (file): Arquivo aberto em modo binário
+        chunk_size (int): Tamanho das leituras
+
+    Returns:
+        str: content_hash em hexadecimal
+    """
+    position = file_obj.tell()
+    file_obj.seek(0)
+    hasher = ContentHasher()
+    for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+        hasher.update(chunk)
+    file_obj.seek(position)
+    return hasher.hexdigest()
@@ -0,0 +1,154 @@
+import re
+from functools import lru_cache
+from operator import attrgetter
+
+# Padrões de CPF: 11 dígitos juntos ou com separadores
+# 00000000000, 000.000.000-00 ou 000 000 000 00
+_CPF_PATTERN = re.compile(r'\b\d{3}[.\-\s]?\d{3}[.\-\s]?\d{3}[.\-\s]?\d{2}\b', re.ASCII)
+
+# Valor ASCII de '0' multiplicado pela soma dos pesos de cada dígito verificador:
+# permite somar os bytes do CPF diretamente, sem converter cada dígito
+_FIRST_OFFSET = 48 * sum(range(2, 11))
+_SECOND_OFFSET = 48 * sum(range(2, 12))
+
+
+@lru_cache(maxsize=65536)
+def is_valid_cpf(cpf):
+    """
+    Verifica os dígitos verificadores de um CPF.
+
+    Args:
+        cpf (str): CPF com 11 dígitos, sem separadores
+
+    Returns:
+        bool: True se o CPF for válido
+    """
+    if len(cpf) != 11 or not cpf.isascii() or not cpf.isdigit() or cpf == cpf[0] * 11:
+        return False
+
+    a, b, c, d, e, f, g, h, i, j, k = cpf.encode()
+    first = (10 * a + 9 * b + 8 * c + 7 * d + 6 * e + 5 * f + 4 * g + 3 * h + 2 * i - _FIRST_OFFSET) * 10 % 11 % 10
+    if first != j - 48:
+        return False
+    second = (11 * a + 10 * b + 9 * c + 8 * d + 7 * e + 6 * f + 5 * g + 4 * h + 3 * i + 2 * j - _SECOND_OFFSET) * 10 % 11 % 10
+    return second == k - 48
+
+
+def _strip_separators(match):
+    """Remove os separadores de um CPF formatado."""
+    digits = match.replace('.', '').replace('-', '').replace(' ', '')
+    if len(digits) != 11:
+        # Outros espaços em branco (tabulação, quebra de linha)
+        digits = ''.join(c for c in digits if c.isdigit())
+    return digits
+
+
+def extract_cpf(filename):
+    """
+    Extrai o primeiro CPF válido do nome de um arquivo.
+
+    Sequências de 11 dígitos com dígitos verificadores inválidos (telefones,
+    datas, protocolos) são ignoradas.
+
+    Args:
+        filename (str): Nome do arquivo
+
+    Returns:
+        str: CPF (apenas dígitos) ou None se não houver CPF válido
+    """
+    for match in _CPF_PATTERN.findall(filename):
+        cpf = match if len(match) == 11 else _strip_separators(match)
+        if is_valid_cpf(cpf):
+            return cpf
+    return None
+
+
+class CPFIndex:
+    """
+    Índice CPF -> arquivos da listagem.
+
+    Guarda as próprias entradas da listagem, sem criar estruturas por arquivo.
+    """
+
+    def __init__(self, entries=None, key=None):
+        """
+        Args:
+            entries (iterable): Entradas da listagem a indexar
+            key (callable): Obtém o nome do arquivo de uma entrada (padrão: entry.name)
+        """
+        self._key = key or attrgetter('name')
+        self._groups = {}
+        self.unmatched = 0  # Arquivos sem CPF válido no nome
+        if entries is not None:
+            self.add_many(entries)
+
+    def add(self, entry):
+        """
+        Indexa uma entrada.
+
+        Returns:
+            str: CPF do arquivo, ou None se não houver CPF válido no nome
+        """
+        cpf = extract_cpf(self._key(entry))
+        if cpf is None:
+            self.unmatched += 1
+        else:
+            self._groups.setdefault(cpf, []).append(entry)
+        return cpf
+
+    def add_many(self, entries):
+        """
+        Indexa várias entradas de uma vez.
+
+        Mesma regra de extract_cpf, com o laço expandido aqui para evitar uma
+        chamada de função por arquivo em listagens grandes.
+        """
+        groups = self._groups
+        key = self._key
+        findall = _CPF_PATTERN.findall
+        valid = is_valid_cpf
+        unmatched = 0
+        for entry in entries:
+            for match in findall(key(entry)):
+                cpf = match if len(match) == 11 else _strip_separators(match)
+                if valid(cpf):
+                    if cpf in groups:
+                        groups[cpf].append(entry)
+                    else:
+                        groups[cpf] = [entry]
+                    break
+            else:
+                unmatched += 1
+        self.unmatched += unmatched
+
+    def __len__(self):
+        return len(self._groups)
+
+    def __contains__(self, cpf):
+        return cpf in self._groups
+
+    def count(self, cpf):
+        """Número de arquivos de um CPF."""
+        return len(self._groups.get(cpf, ()))
+
+    def counts(self):
+        """
+        Returns:
+            dict: Número de arquivos por CPF
+        """
+        return {cpf: len(entries) for cpf, entries in self._groups.items()}
+
+    def get(self, cpf):
+        """Arquivos de um CPF (lista vazia se desconhecido)."""
+        return self._groups.get(cpf, [])
+
+    def groups(self, min_size=1):
+        """
+        Itera sobre os grupos com pelo menos min_size arquivos.
+
+        Yields:
+            tuple: (cpf, lista de entradas)
+        """
+        for cpf, entries in self._groups.items():
+            if len(entries) >= min_size:
+                yield cpf, entries
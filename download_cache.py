@@ -0,0 +1,151 @@
+import os
+import re
+import threading
+from content_hash import ContentHasher
+from logger import get_logger
+from config import DOWNLOAD_CACHE_DIR, DOWNLOAD_CACHE_MAX_BYTES
+
+logger = get_logger()
+
+_HASH_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+class DownloadCache:
+    """
+    Cache local de arquivos baixados do Dropbox, endereçado pelo content_hash.
+
+    Cada arquivo é guardado como <diretório>/<content_hash>. O tamanho total é
+    limitado a max_bytes; ao ultrapassá-lo, os arquivos usados há mais tempo
+    (mtime atualizado a cada acerto) são removidos primeiro.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        """
+        Args:
+            directory (str): Diretório do cache (padrão: DOWNLOAD_CACHE_DIR)
+            max_bytes (int): Tamanho máximo do cache (padrão: DOWNLOAD_CACHE_MAX_BYTES)
+        """
+        self.directory = directory or DOWNLOAD_CACHE_DIR
+        self.max_bytes = DOWNLOAD_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def _path(self, content_hash):
+        if not content_hash or not _HASH_PATTERN.fullmatch(content_hash):
+            return None
+        return os.path.join(self.directory, content_hash)
+
+    def open(self, content_hash):
+        """
+        Abre o arquivo em cache para leitura.
+
+        Returns:
+            file: Arquivo aberto em modo binário, ou None se não estiver em cache
+        """
+        path = self._path(content_hash)
+        if path is None:
+            return None
+        try:
+            cached_file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        # Marca como usado recentemente para a política LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return cached_file
+
+    def writer(self, content_hash):
+        """
+        Cria um gravador para adicionar um arquivo ao cache durante o download.
+
+        Returns:
+            _CacheWriter: Gravador, ou None se o content_hash for inválido
+        """
+        path = self._path(content_hash)
+        if path is None:
+            return None
+        return _CacheWriter(self, path, content_hash)
+
+    def _added(self, size):
+        with self._lock:
+            self._total_bytes += size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def _scan(self):
+        """Lista (caminho, tamanho, mtime) dos arquivos em cache."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not _HASH_PATTERN.fullmatch(name):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        """Remove os arquivos menos usados recentemente até respeitar max_bytes."""
+        with self._lock:
+            entries = sorted(self._scan(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    pass
+            self._total_bytes = total
+        if removed:
+            logger.info(f"Cache de downloads: {removed} arquivo(s) removido(s) para respeitar o limite")
+
+
+class _CacheWriter:
+    """
+    Grava um arquivo no cache em um arquivo temporário e só o publica se o
+    conteúdo corresponder ao content_hash esperado.
+    """
+
+    def __init__(self, cache, path, content_hash):
+        self.cache = cache
+        self.path = path
+        self.content_hash = content_hash
+        self._temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = open(self._temp_path, 'wb')
+        self._hasher = ContentHasher()
+        self._size = 0
+
+    def write(self, data):
+        self._file.write(data)
+        self._hasher.update(data)
+        self._size += len(data)
+
+    def commit(self):
+        """Publica o arquivo no cache se o content_hash conferir."""
+        self._file.close()
+        if self._hasher.hexdigest() != self.content_hash:
+            logger.warning(f"Cache de downloads: content_hash divergente para {self.content_hash}, arquivo descartado")
+            self.abort()
+            return
+        os.replace(self._temp_path, self.path)
+        self.cache._added(self._size)
+
+    def abort(self):
+        """Descarta o arquivo temporário."""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self._temp_path)
+        except OSError:
+            pass
@@ -1,29 +1,71 @@
 import os
 import io
+import json
+import time
 import tempfile
+import threading
+import requests
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dropbox import Dropbox
-from dropbox.exceptions import ApiError, AuthError
-from dropbox.files import WriteMode
+from dropbox.exceptions import ApiError, AuthError, InternalServerError, RateLimitError
+from dropbox.files import (
+    WriteMode,
+    CommitInfo,
+    UploadSessionCursor,
+    RelocationPath,
+    FileMetadata,
+    FolderMetadata,
+    DeletedMetadata,
+    SearchOptions,
+    FileCategory
+)
+import metrics
+from concurrency import ConcurrencyGovernor, backoff_delay
+from http_pool import create_pooled_session, connection_stats
+from token_cache import TokenCache
+from download_cache import DownloadCache
+from file_entry import FileEntry
 from logger import get_logger
 from config import (
     DROPBOX_BASE_FOLDER,
     DROPBOX_SOURCE_FOLDER_NAME,
     DROPBOX_OUTPUT_FOLDER_NAME,
-    DROPBOX_PROCESSED_FOLDER_NAME,
     DROPBOX_SOURCE_PATH,
     DROPBOX_OUTPUT_PATH,
-    DROPBOX_PROCESSED_PATH
+    DROPBOX_PROCESSED_PATH,
+    DOWNLOAD_MAX_WORKERS,
+    DOWNLOAD_SPOOL_MAX_MEMORY,
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_CACHE_ENABLED,
+    TOKEN_CACHE_ENABLED,
+    UPLOAD_SESSION_THRESHOLD,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_CHUNK_RETRIES,
+    RATE_LIMIT_MAX_RETRIES,
+    MOVE_BATCH_SIZE,
+    MOVE_BATCH_TIMEOUT,
+    LIST_INCREMENTAL,
+    LIST_STATE_FILE,
+    FOLDER_CACHE_TTL,
+    STARTUP_STATE_FILE,
+    FIND_FOLDER_MAX_WORKERS,
+    FIND_FOLDER_SEARCH_RESULTS
 )
 
 logger = get_logger()
 
+# Calls that are not limited by the concurrency governor: a longpoll waits on the
+# server for minutes and would hold a slot without using the API quota
+UNGOVERNED_OPERATIONS = frozenset({'files_list_folder_longpoll'})
+
 class DropboxHandler:
     """
     Class to handle all Dropbox operations including file listing, download, upload, and move.
     Supports automatic token refresh using app credentials and refresh token.
     """
     
-    def __init__(self, app_key, app_secret, refresh_token):
+    def __init__(self, app_key, app_secret, refresh_token, session=None, validate=True):
         """
         Initialize the Dropbox client with app credentials and refresh token.
         This allows for automatic token refresh when tokens expire.
@@ -32,102 +74,276 @@ class DropboxHandler:
             app_key (str): Dropbox API app key
             app_secret (str): Dropbox API app secret
             refresh_token (str): OAuth2 refresh token for automatic token renewal
+            session (requests.Session): HTTP session for the client (defaults to
+                http_pool.create_pooled_session())
+            validate (bool): Check the account right away; if False, call validate()
+                later to check the account and the folders together
         """
         self.app_key = app_key
         self.app_secret = app_secret
         self.refresh_token = refresh_token
-        self.source_folder_path = None  # Will store the path where "COMPROVANTE DE PAGAMENTO" is found
+        
+        # Resolved folder paths by role, checked again after FOLDER_CACHE_TTL seconds
+        self._folder_cache = {}
+        self._folder_cache_time = 0
+        self._folder_cache_lock = threading.Lock()
+        self._folder_state_loaded = False
+        
+        # Local copies of downloaded files, keyed by Dropbox content_hash
+        self.download_cache = DownloadCache() if DOWNLOAD_CACHE_ENABLED else None
+        
+        # Callables notified of every API call as (operation, seconds, error), and
+        # whether each one also wants background calls (see background_calls)
+        self._call_listeners = [(metrics.record_call, True)]
+        self._background = threading.local()
+        
+        # Shared limit of in-flight API calls, adapted to the rate limits Dropbox reports
+        self.governor = ConcurrencyGovernor()
+        
+        # Keep-alive connection pools sized for the transfer concurrency
+        self.session = session or create_pooled_session()
+        metrics.track_session(self.session)
+        
+        # Access token shared by all worker processes and refreshed in the background
+        self.token_cache = None
+        if TOKEN_CACHE_ENABLED:
+            self.token_cache = TokenCache(app_key, app_secret, refresh_token, self.session)
         
         # Initialize Dropbox client with refresh token
         try:
+            token = self.token_cache.get() if self.token_cache else None
+            self._access_token = token
             self.dbx = Dropbox(
+                oauth2_access_token=token.value if token else None,
+                oauth2_access_token_expiration=token.expiration if token else None,
                 oauth2_refresh_token=refresh_token,
                 app_key=app_key, 
-                app_secret=app_secret
+                app_secret=app_secret,
+                session=self.session,
+                # Rate limits are retried by _call, which also adjusts the concurrency
+                max_retries_on_rate_limit=0
             )
             
-            # Test the connection
-            self.dbx.users_get_current_account()
-            logger.info("Dropbox authentication successful")
+            if validate:
+                self._check_account()
         except AuthError as e:
             logger.error(f"Dropbox authentication failed: {str(e)}")
             raise
+        
+        if self.token_cache:
+            self.token_cache.start_refresher(self._use_access_token)
+    
+    def _check_account(self, governed=True):
+        """
+        Test the connection, unless another worker already did with these credentials.
+        
+        Args:
+            governed (bool): Whether the call waits for a slot of the concurrency governor
+        """
+        if self.token_cache and self.token_cache.account_verified():
+            logger.info("Dropbox credentials already verified; skipping account check")
+            return
+        self._call('users_get_current_account', governed=governed)
+        if self.token_cache:
+            self.token_cache.mark_account_verified()
+        logger.info("Dropbox authentication successful")
+    
+    def validate(self):
+        """
+        Check the account and resolve the folders concurrently, so startup costs a
+        single round of API calls. Folders validated by another process recently
+        (STARTUP_STATE_FILE) are reused without any call.
+        
+        These few checks bypass the concurrency governor, so they all run in one
+        round without raising the limit that processing runs start from.
+        
+        Returns:
+            dict: Resolved folder paths by role ('source', 'output', 'processed')
+            
+        Raises:
+            AuthError: If the credentials are rejected
+        """
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="dropbox-startup") as executor:
+            account = executor.submit(self._check_account, governed=False)
+            folders = executor.submit(self._resolve_folders, governed=False)
+            try:
+                account.result()
+            except AuthError as e:
+                logger.error(f"Dropbox authentication failed: {str(e)}")
+                raise
+            return folders.result()
+    
+    def _use_access_token(self, token):
+        """
+        Switch to a refreshed access token. Calls already in flight finish with
+        the previous client.
+        
+        Args:
+            token (token_cache.AccessToken): The new access token
+        """
+        self.dbx = self.dbx.clone(
+            oauth2_access_token=token.value,
+            oauth2_access_token_expiration=token.expiration
+        )
+        self._access_token = token
+        logger.info("Dropbox access token refreshed")
+    
+    def before_fork(self):
+        """
+        Prepare the handler to be inherited by forked worker processes (gunicorn
+        with preload). The token refresher is stopped and pooled connections are
+        closed: a TLS connection must never be shared by two processes.
+        """
+        if self.token_cache:
+            self.token_cache.stop_refresher()
+        self._close_connections()
+    
+    def after_fork(self):
+        """
+        Restart the per-process parts of an inherited handler in a new worker:
+        an empty connection pool, a current access token (the parent's may have
+        expired since it was loaded) and this process's token refresher.
+        """
+        self._close_connections()
+        if self.token_cache:
+            self.token_cache.start_refresher(self._use_access_token)
+            token = self.token_cache.get()
+            if token is not self._access_token:
+                self._use_access_token(token)
+    
+    def _close_connections(self):
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        for adapter in adapters.values():
+            adapter.close()
+    
+    def _call(self, operation, *args, governed=True, **kwargs):
+        """
+        Call a Dropbox API method through the concurrency governor.
+        
+        A RateLimitError is retried up to RATE_LIMIT_MAX_RETRIES times, waiting for
+        the retry_after sent by Dropbox plus a random backoff.
+        
+        Args:
+            operation (str): Name of the Dropbox client method (e.g. 'files_download')
+            *args, **kwargs: Arguments for the method
+            governed (bool): If False, the call does not wait for a governor slot
+                (startup checks, see validate)
+            
+        Returns:
+            The method's result
+        """
+        governed = governed and operation not in UNGOVERNED_OPERATIONS
+        governor = self.governor if governed else None
+        attempt = 0
+        while True:
+            try:
+                return self._call_once(governor, operation, args, kwargs)
+            except RateLimitError as e:
+                attempt += 1
+                if attempt > RATE_LIMIT_MAX_RETRIES:
+                    logger.error(f"Rate limited on {operation}; giving up after {RATE_LIMIT_MAX_RETRIES} retries")
+                    raise
+                delay = backoff_delay(attempt, e.backoff)
+                logger.warning(f"Rate limited on {operation}. Retry {attempt}/{RATE_LIMIT_MAX_RETRIES} in {delay:.1f}s")
+                metrics.record_retry(operation)
+                time.sleep(delay)
+    
+    def _call_once(self, governor, operation, args, kwargs):
+        """
+        Make a single API call and report its latency to the call listeners.
+        """
+        ticket = governor.acquire() if governor else None
+        start = time.perf_counter()
+        error = None
+        try:
+            return getattr(self.dbx, operation)(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            if governor:
+                throttled = isinstance(error, RateLimitError)
+                governor.release(
+                    ticket,
+                    throttled=throttled,
+                    retry_after=error.backoff if throttled else None,
+                    # Only calls answered by the API count as capacity to grow into
+                    neutral=error is not None and not isinstance(error, ApiError)
+                )
+            background = operation in UNGOVERNED_OPERATIONS or getattr(self._background, 'active', False)
+            for listener, include_background in list(self._call_listeners):
+                if background and not include_background:
+                    continue
+                try:
+                    listener(operation, elapsed, error)
+                except Exception as listener_error:
+                    logger.warning(f"Call listener failed: {str(listener_error)}")
+    
+    def connection_stats(self):
+        """
+        Connection reuse of the HTTP session, per Dropbox host.
+        
+        Returns:
+            dict: See http_pool.connection_stats
+        """
+        return connection_stats(self.session)
+    
+    def add_call_listener(self, listener, include_background=True):
+        """
+        Register a callable notified after every API call with (operation, seconds, error).
+        
+        Args:
+            listener (callable): The callable to notify
+            include_background (bool): If False, calls that are not part of a processing
+                run (longpolls and calls made inside background_calls) are not reported
+        """
+        self._call_listeners.append((listener, include_background))
+    
+    def remove_call_listener(self, listener):
+        """Unregister a listener added with add_call_listener."""
+        self._call_listeners = [entry for entry in self._call_listeners if entry[0] != listener]
+    
+    @contextmanager
+    def background_calls(self):
+        """
+        Mark the API calls made by the current thread as background work (e.g. the
+        folder watcher), so they are not counted in the stats of a concurrent run.
+        """
+        previous = getattr(self._background, 'active', False)
+        self._background.active = True
+        try:
+            yield
+        finally:
+            self._background.active = previous
     
     def find_folder(self, folder_name, parent_path="", max_depth=5):
         """
-        Recursively search for a folder with the given name in Dropbox.
+        Search for a folder with the given name in Dropbox.
+        
+        First asks files_search_v2 for folders with that name. If the search index
+        has no match, walks the tree breadth-first, listing all directories of a
+        level concurrently and stopping at the first match.
         
         Args:
             folder_name (str): Name of the folder to find
             parent_path (str): Path to start searching from
-            max_depth (int): Maximum recursion depth to search
+            max_depth (int): Maximum number of levels to search below parent_path
             
         Returns:
             str: Full path to the folder if found, None otherwise
         """
-        # Break recursion if we've gone too deep
         if max_depth <= 0:
             return None
-            
+        
         try:
-            logger.info(f"Searching for folder '{folder_name}' in '{parent_path}'")
+            found_path = self._search_folder(folder_name, parent_path, max_depth)
+            if not found_path:
+                found_path = self._walk_for_folder(folder_name, parent_path, max_depth)
             
-            # List contents of the current directory
-            try:
-                result = self.dbx.files_list_folder(parent_path)
-                if not result:
-                    logger.warning(f"No result returned when listing folder: {parent_path}")
-                    return None
-                
-                subdirs = []
-                    
-                # Check if the folder exists in the current directory
-                if hasattr(result, 'entries'):
-                    for entry in result.entries:
-                        if hasattr(entry, 'is_dir') and entry.is_dir and hasattr(entry, 'name'):
-                            # If this is the folder we're looking for
-                            if entry.name == folder_name and hasattr(entry, 'path_display'):
-                                full_path = entry.path_display
-                                logger.info(f"Found folder '{folder_name}' at '{full_path}'")
-                                return full_path
-                            # Otherwise, add to subdirs list for later recursion
-                            if hasattr(entry, 'path_display'):
-                                subdirs.append(entry.path_display)
-                
-                # Continue fetching if there are more results
-                while hasattr(result, 'has_more') and result.has_more:
-                    if hasattr(result, 'cursor'):
-                        result = self.dbx.files_list_folder_continue(result.cursor)
-                        if not result:
-                            break
-                            
-                        if hasattr(result, 'entries'):
-                            for entry in result.entries:
-                                if hasattr(entry, 'is_dir') and entry.is_dir and hasattr(entry, 'name'):
-                                    # If this is the folder we're looking for
-                                    if entry.name == folder_name and hasattr(entry, 'path_display'):
-                                        full_path = entry.path_display
-                                        logger.info(f"Found folder '{folder_name}' at '{full_path}'")
-                                        return full_path
-                                    # Otherwise, add to subdirs list for later recursion
-                                    if hasattr(entry, 'path_display'):
-                                        subdirs.append(entry.path_display)
-                    else:
-                        break
-                
-                # Now recursively search all subdirectories
-                for subdir in subdirs:
-                    found_path = self.find_folder(folder_name, subdir, max_depth - 1)
-                    if found_path:
-                        return found_path
-                        
-            except ApiError as api_error:
-                logger.error(f"API error when listing folder {parent_path}: {str(api_error)}")
-                # If it's a path error and the path doesn't exist, just return None
-                if api_error.error.is_path() and api_error.error.get_path().is_not_found():
-                    return None
-                # For other API errors, raise them to be handled by the caller
-                raise
+            if found_path:
+                logger.info(f"Found folder '{folder_name}' at '{found_path}'")
+                return found_path
             
             logger.info(f"Folder '{folder_name}' not found in '{parent_path}'")
             return None
@@ -136,6 +352,116 @@ class DropboxHandler:
             logger.error(f"Error searching for folder '{folder_name}': {str(e)}")
             return None
     
+    def _search_folder(self, folder_name, parent_path, max_depth):
+        """
+        Look up a folder by name with files_search_v2.
+        
+        Returns:
+            str: Path of the shallowest exact match within max_depth, or None
+        """
+        logger.info(f"Searching index for folder '{folder_name}' in '{parent_path}'")
+        
+        options = SearchOptions(
+            path=parent_path or None,
+            file_categories=[FileCategory.folder],
+            filename_only=True,
+            max_results=FIND_FOLDER_SEARCH_RESULTS
+        )
+        base_depth = len([part for part in parent_path.split('/') if part])
+        
+        try:
+            result = self._call('files_search_v2', folder_name, options=options)
+        except ApiError as e:
+            logger.warning(f"Search for folder '{folder_name}' failed: {str(e)}")
+            return None
+        
+        best = None
+        while True:
+            for match in result.matches:
+                if not match.metadata.is_metadata():
+                    continue
+                entry = match.metadata.get_metadata()
+                if not isinstance(entry, FolderMetadata) or entry.name != folder_name:
+                    continue
+                depth = len([part for part in entry.path_display.split('/') if part]) - base_depth
+                if depth <= max_depth and (best is None or depth < best[0]):
+                    best = (depth, entry.path_display)
+            
+            if best or not result.has_more:
+                break
+            try:
+                result = self._call('files_search_continue_v2', result.cursor)
+            except ApiError as e:
+                # Nothing found so far: find_folder falls back to walking the tree
+                logger.warning(f"Search for folder '{folder_name}' failed while paging: {str(e)}")
+                return None
+        
+        return best[1] if best else None
+    
+    def _walk_for_folder(self, folder_name, parent_path, max_depth):
+        """
+        Breadth-first search for a folder, listing each level concurrently.
+        
+        Returns:
+            str: Path of the first match found, or None
+        """
+        level = [parent_path]
+        
+        for depth in range(max_depth):
+            if not level:
+                break
+            
+            logger.info(f"Searching for folder '{folder_name}' in {len(level)} folder(s) at depth {depth}")
+            
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, min(FIND_FOLDER_MAX_WORKERS, len(level))),
+                thread_name_prefix="dropbox-find-folder"
+            )
+            try:
+                futures = [executor.submit(self._list_subfolders, folder_name, path) for path in level]
+                next_level = []
+                for future in as_completed(futures):
+                    found_path, subdirs = future.result()
+                    if found_path:
+                        return found_path
+                    next_level.extend(subdirs)
+            finally:
+                # Stop listing the rest of the level as soon as there is a match
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            level = next_level
+        
+        return None
+    
+    def _list_subfolders(self, folder_name, parent_path):
+        """
+        List the direct subfolders of a folder, looking for folder_name among them.
+        
+        Returns:
+            tuple: (path of the match or None, list of subfolder paths)
+        """
+        subdirs = []
+        try:
+            result = self._call('files_list_folder', parent_path)
+            while True:
+                for entry in result.entries:
+                    if isinstance(entry, FolderMetadata):
+                        # If this is the folder we're looking for
+                        if entry.name == folder_name:
+                            return entry.path_display, []
+                        subdirs.append(entry.path_display)
+                
+                if not result.has_more:
+                    break
+                result = self._call('files_list_folder_continue', result.cursor)
+        except ApiError as api_error:
+            # A folder removed while walking is skipped; other errors skip only this branch
+            if not self._is_not_found(api_error):
+                logger.error(f"API error when listing folder {parent_path}: {str(api_error)}")
+            return None, []
+        
+        return None, subdirs
+    
     def get_source_folder_path(self):
         """
         Find the source folder path within the specified base folder.
@@ -144,36 +470,225 @@ class DropboxHandler:
         Returns:
             str: Path to the source folder or None if not found
         """
-        if self.source_folder_path:
-            return self.source_folder_path
-            
-        # Use as configurações do config.py
-        base_folder = DROPBOX_BASE_FOLDER
-        folder_name = DROPBOX_SOURCE_FOLDER_NAME
-        target_path = DROPBOX_SOURCE_PATH
+        return self._resolve_folders().get('source')
+    
+    def _resolve_folders(self, governed=True):
+        """
+        Resolve the base, source, output and processed folders, using a cache.
         
-        try:
-            # Verifica se a pasta base existe
-            try:
-                self.dbx.files_get_metadata(base_folder)
-            except ApiError:
+        On first use (or once FOLDER_CACHE_TTL expires) all folders are checked
+        concurrently with files_get_metadata. The processed folder is created if
+        missing. Folders that could not be resolved are checked again on the next call.
+        
+        Args:
+            governed (bool): Whether the checks wait for slots of the concurrency governor
+        
+        Returns:
+            dict: Resolved paths by role ('source', 'output', 'processed')
+        """
+        with self._folder_cache_lock:
+            age = time.monotonic() - self._folder_cache_time
+            if len(self._folder_cache) == 3 and age < FOLDER_CACHE_TTL:
+                return self._folder_cache
+            
+            # First resolution in this process: reuse the folders another worker just validated
+            if not self._folder_state_loaded:
+                self._folder_state_loaded = True
+                folders = self._load_folder_state()
+                if folders:
+                    logger.info("Pastas do Dropbox carregadas do estado de inicialização")
+                    self._folder_cache = folders
+                    self._folder_cache_time = time.monotonic()
+                    return folders
+            
+            base_folder = DROPBOX_BASE_FOLDER
+            targets = {
+                'base': base_folder,
+                'source': DROPBOX_SOURCE_PATH,
+                'output': DROPBOX_OUTPUT_PATH,
+                'processed': DROPBOX_PROCESSED_PATH
+            }
+            
+            with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="dropbox-folders") as executor:
+                futures = {role: executor.submit(self._folder_exists, path, governed) for role, path in targets.items()}
+            
+            exists = {}
+            for role, future in futures.items():
+                try:
+                    exists[role] = future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao verificar pasta '{targets[role]}': {str(e)}")
+                    exists[role] = None
+            
+            folders = {}
+            if exists['base'] is False:
                 logger.error(f"Pasta base '{base_folder}' não encontrada no Dropbox. Esta pasta deve existir previamente.")
-                return None
+            else:
+                if exists['base'] is None:
+                    # The error was logged above; the other checks used full paths and still hold
+                    logger.warning(f"Não foi possível verificar a pasta base '{base_folder}'; usando o resultado das demais verificações")
                 
-            # Verifica se a pasta alvo existe dentro da pasta base
-            try:
-                self.dbx.files_get_metadata(target_path)
-                logger.info(f"Pasta de origem encontrada em: {target_path}")
-                self.source_folder_path = target_path
-                return target_path
-            except ApiError:
-                logger.error(f"Pasta '{folder_name}' não encontrada dentro de '{base_folder}'")
+                if exists['source']:
+                    logger.info(f"Pasta de origem encontrada em: {DROPBOX_SOURCE_PATH}")
+                    folders['source'] = DROPBOX_SOURCE_PATH
+                elif exists['source'] is False:
+                    logger.error(f"Pasta '{DROPBOX_SOURCE_FOLDER_NAME}' não encontrada no Dropbox. Esta pasta deve existir em '{base_folder}'.")
+                
+                if exists['output']:
+                    logger.info(f"Pasta de saída encontrada em: {DROPBOX_OUTPUT_PATH}")
+                    folders['output'] = DROPBOX_OUTPUT_PATH
+                elif exists['output'] is False:
+                    logger.error(f"Pasta '{DROPBOX_OUTPUT_FOLDER_NAME}' não encontrada no Dropbox. Esta pasta deve existir em '{base_folder}'.")
+                
+                if exists['processed']:
+                    logger.info(f"Pasta de processados encontrada em: {DROPBOX_PROCESSED_PATH}")
+                    folders['processed'] = DROPBOX_PROCESSED_PATH
+                elif exists['processed'] is False and exists['base']:
+                    # Se a pasta não existir, tenta criá-la (só com a pasta base confirmada)
+                    try:
+                        logger.info(f"Criando pasta de processados em: {DROPBOX_PROCESSED_PATH}")
+                        self._call('files_create_folder_v2', DROPBOX_PROCESSED_PATH, governed=governed)
+                        logger.info(f"Pasta criada com sucesso: {DROPBOX_PROCESSED_PATH}")
+                        folders['processed'] = DROPBOX_PROCESSED_PATH
+                    except ApiError as create_error:
+                        logger.error(f"Erro ao criar pasta de processados: {str(create_error)}")
+            
+            self._folder_cache = folders
+            self._folder_cache_time = time.monotonic()
+            if len(folders) == 3:
+                self._save_folder_state(folders)
+            return folders
+    
+    def _folder_state_key(self):
+        """
+        Identify the configured folders and credentials, so a state file written
+        for another configuration is ignored.
+        """
+        return [self.app_key, DROPBOX_SOURCE_PATH, DROPBOX_OUTPUT_PATH, DROPBOX_PROCESSED_PATH]
+    
+    def _load_folder_state(self):
+        """
+        Load the folders resolved by another process, if recent enough.
+        
+        Returns:
+            dict: Folder paths by role, or None
+        """
+        try:
+            with open(STARTUP_STATE_FILE, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Estado de inicialização ilegível: {str(e)}")
+            return None
+        
+        if state.get('key') != self._folder_state_key():
+            return None
+        if not 0 <= time.time() - state.get('validated_at', 0) < FOLDER_CACHE_TTL:
+            return None
+        folders = state.get('folders') or {}
+        if set(folders) != {'source', 'output', 'processed'}:
+            return None
+        return folders
+    
+    def _save_folder_state(self, folders):
+        """
+        Persist the resolved folders for the other worker processes.
+        """
+        state = {
+            'key': self._folder_state_key(),
+            'folders': folders,
+            'validated_at': time.time()
+        }
+        try:
+            os.makedirs(os.path.dirname(STARTUP_STATE_FILE) or '.', exist_ok=True)
+            temp_path = f"{STARTUP_STATE_FILE}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(temp_path, STARTUP_STATE_FILE)
         except Exception as e:
-            logger.error(f"Erro ao buscar pasta de origem: {str(e)}")
+            logger.warning(f"Não foi possível salvar o estado de inicialização: {str(e)}")
+    
+    def _folder_exists(self, path, governed=True):
+        """
+        Check whether a path exists in Dropbox.
         
-        # Se não encontrada, retorna None
-        logger.error(f"Pasta '{folder_name}' não encontrada no Dropbox. Esta pasta deve existir em '{base_folder}'.")
-        return None
+        Args:
+            path (str): Path to check
+            governed (bool): Whether the call waits for a slot of the concurrency governor
+        
+        Returns:
+            bool: True if it exists, False if Dropbox reports it as not found
+        """
+        try:
+            self._call('files_get_metadata', path, governed=governed)
+            return True
+        except ApiError as e:
+            if self._is_not_found(e):
+                return False
+            raise
+    
+    def invalidate_folder_cache(self):
+        """
+        Discard the resolved folders so they are checked again on next use.
+        """
+        with self._folder_cache_lock:
+            if self._folder_cache:
+                logger.info("Cache de pastas invalidado")
+            self._folder_cache = {}
+            self._folder_cache_time = 0
+            self._folder_state_loaded = True
+            # The other workers must not start from folders that no longer exist
+            try:
+                os.remove(STARTUP_STATE_FILE)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Não foi possível remover o estado de inicialização: {str(e)}")
+    
+    @staticmethod
+    def _is_not_found(api_error):
+        """
+        Check whether an ApiError is a path-not-found error.
+        """
+        error = getattr(api_error, 'error', None)
+        if error is None:
+            return False
+        
+        # Batch move failures wrap the relocation error
+        if hasattr(error, 'is_relocation_error') and error.is_relocation_error():
+            error = error.get_relocation_error()
+        
+        for kind in ('path', 'from_lookup'):
+            is_kind = getattr(error, f'is_{kind}', None)
+            if is_kind and is_kind():
+                lookup = getattr(error, f'get_{kind}')()
+                return hasattr(lookup, 'is_not_found') and lookup.is_not_found()
+        return False
+    
+    def _check_not_found(self, api_error, path):
+        """
+        Invalidate the folder cache when an API call fails with path-not-found on
+        one of the resolved folders or on a folder containing them.
+        
+        A missing file inside a folder (deleted by someone, or already moved) does
+        not say anything about the folders themselves and keeps the cache.
+        
+        Args:
+            api_error (Exception): Error raised by the API call
+            path (str): Dropbox path the call operated on
+        """
+        if not path or not (isinstance(api_error, ApiError) and self._is_not_found(api_error)):
+            return
+        
+        missing = path.rstrip('/').lower()
+        with self._folder_cache_lock:
+            folders = [DROPBOX_BASE_FOLDER, *self._folder_cache.values()]
+        for folder in folders:
+            folder = folder.rstrip('/').lower()
+            if folder == missing or folder.startswith(missing + '/'):
+                self.invalidate_folder_cache()
+                return
     
     def get_parent_path(self, path):
         """
@@ -202,87 +717,262 @@ class DropboxHandler:
             
         return parent
     
-    def list_files(self, folder_path=None, recursive=True):
+    def list_files(self, folder_path=None, recursive=True, incremental=None):
         """
         Lista todos os arquivos PDF de uma pasta do Dropbox.
         
+        No modo incremental, o cursor de files_list_folder e o resultado da última
+        listagem são persistidos em LIST_STATE_FILE; as execuções seguintes buscam
+        apenas as alterações com files_list_folder_continue. Se o cursor for
+        invalidado pelo Dropbox, é feita uma listagem completa.
+        
         Args:
             folder_path (str): Caminho para a pasta no Dropbox. Se None, usa a pasta de origem.
             recursive (bool): Se True, lista arquivos em subpastas também.
+            incremental (bool): Se True, usa o cursor persistido. Se None, usa LIST_INCREMENTAL.
             
         Returns:
-            list: Lista de dicionários com metadados de arquivo
+            list: Lista de FileEntry com os metadados de cada arquivo
+            
+        Raises:
+            Exception: Se a listagem falhar; uma listagem vazia significa apenas
+                que a pasta não tem PDFs
         """
         if folder_path is None:
             folder_path = self.get_source_folder_path()
+        if incremental is None:
+            incremental = LIST_INCREMENTAL
             
         logger.info(f"Buscando arquivos PDF em: {folder_path}")
         
-        # Lista para armazenar os arquivos PDF encontrados
-        pdf_files = []
-        
         try:
-            # Listar arquivos na pasta usando a API direta
-            result = self.dbx.files_list_folder(
-                folder_path,
-                recursive=recursive,
-                include_non_downloadable_files=False
-            )
+            state = self._load_list_state(folder_path, recursive) if incremental else None
             
-            # Processar os resultados iniciais
-            if hasattr(result, 'entries'):
-                for entry in result.entries:
-                    # Verificar se tem os atributos necessários
-                    if hasattr(entry, 'name') and hasattr(entry, 'path_display'):
-                        # Verificar se é um arquivo PDF
-                        if entry.name.lower().endswith('.pdf'):
-                            # Adicionar à lista como dicionário
-                            pdf_files.append({
-                                'name': entry.name,
-                                'path_display': entry.path_display
-                            })
-            
-            # Continuar buscando se houver mais arquivos
-            while hasattr(result, 'has_more') and result.has_more:
-                if hasattr(result, 'cursor'):
-                    result = self.dbx.files_list_folder_continue(result.cursor)
-                    if not result:
-                        break
-                    
-                    if hasattr(result, 'entries'):
-                        for entry in result.entries:
-                            # Verificar se tem os atributos necessários
-                            if hasattr(entry, 'name') and hasattr(entry, 'path_display'):
-                                # Verificar se é um arquivo PDF
-                                if entry.name.lower().endswith('.pdf'):
-                                    # Adicionar à lista como dicionário
-                                    pdf_files.append({
-                                        'name': entry.name,
-                                        'path_display': entry.path_display
-                                    })
-                else:
-                    break
+            if state:
+                try:
+                    entries, cursor, changes = self._apply_list_delta(state['entries'], state['cursor'])
+                    logger.info(f"Listagem incremental: {changes} alterações desde a última execução")
+                except ApiError as e:
+                    if hasattr(e.error, 'is_reset') and e.error.is_reset():
+                        logger.warning("Cursor de listagem invalidado pelo Dropbox. Fazendo listagem completa")
+                    else:
+                        logger.warning(f"Falha na listagem incremental ({str(e)}). Fazendo listagem completa")
+                    state = None
+            
+            if not state:
+                # Listar arquivos na pasta usando a API direta
+                result = self._call(
+                    'files_list_folder',
+                    folder_path,
+                    recursive=recursive,
+                    include_non_downloadable_files=False
+                )
+                entries, cursor, _ = self._apply_list_delta({}, None, result)
             
-            # Log do total de arquivos encontrados
-            return pdf_files
+            if incremental:
+                self._save_list_state(folder_path, recursive, cursor, entries)
+            
+            return list(entries.values())
             
         except Exception as e:
             logger.error(f"Erro ao listar arquivos PDF em {folder_path}: {str(e)}")
-            return []
+            self._check_not_found(e, folder_path)
+            raise
+    
+    def _apply_list_delta(self, entries, cursor, result=None):
+        """
+        Aplica as páginas de uma listagem (completa ou incremental) a um conjunto de arquivos.
+        
+        Args:
+            entries (dict): FileEntry dos arquivos PDF conhecidos, indexados por path_lower
+            cursor (str): Cursor a continuar; ignorado se result for informado
+            result (ListFolderResult): Primeira página já obtida
+            
+        Returns:
+            tuple: (arquivos atualizados, cursor final, número de alterações)
+        """
+        entries = dict(entries)
+        changes = 0
+        
+        if result is None:
+            result = self._call('files_list_folder_continue', cursor)
+        
+        while True:
+            for entry in result.entries:
+                if isinstance(entry, DeletedMetadata):
+                    # Um item removido pode ser uma pasta: remove também o conteúdo
+                    prefix = entry.path_lower + '/'
+                    removed = [path for path in entries if path == entry.path_lower or path.startswith(prefix)]
+                    for path in removed:
+                        del entries[path]
+                    changes += len(removed)
+                elif isinstance(entry, FileMetadata) and entry.name.lower().endswith('.pdf'):
+                    entries[entry.path_lower] = FileEntry.from_metadata(entry)
+                    changes += 1
+            
+            cursor = result.cursor
+            if not result.has_more:
+                break
+            result = self._call('files_list_folder_continue', cursor)
+        
+        return entries, cursor, changes
+    
+    def get_content_hashes(self, folder_path):
+        """
+        Fetch the content_hash of every file directly inside a folder in one listing.
+        
+        Args:
+            folder_path (str): Folder in Dropbox
+            
+        Returns:
+            dict: content_hash by lower-cased file name
+        """
+        hashes = {}
+        result = self._call('files_list_folder', folder_path, include_non_downloadable_files=False)
+        while True:
+            for entry in result.entries:
+                if isinstance(entry, FileMetadata):
+                    hashes[entry.name.lower()] = entry.content_hash
+            if not result.has_more:
+                return hashes
+            result = self._call('files_list_folder_continue', result.cursor)
+    
+    def get_latest_cursor(self, folder_path=None, recursive=True):
+        """
+        Get a list_folder cursor for the current state of a folder, without listing it.
+        
+        Args:
+            folder_path (str): Folder in Dropbox. If None, uses the source folder.
+            recursive (bool): Whether the cursor covers subfolders
+            
+        Returns:
+            str: The cursor
+        """
+        if folder_path is None:
+            folder_path = self.get_source_folder_path()
+        result = self._call(
+            'files_list_folder_get_latest_cursor',
+            folder_path,
+            recursive=recursive,
+            include_non_downloadable_files=False
+        )
+        return result.cursor
+    
+    def longpoll(self, cursor, timeout=30):
+        """
+        Block until the folder behind cursor changes or the timeout expires.
+        
+        Args:
+            cursor (str): Cursor from get_latest_cursor or a previous listing
+            timeout (int): Seconds to wait (30 to 480)
+            
+        Returns:
+            tuple: (changes, backoff) where backoff is the number of seconds to wait
+                before polling again, or None
+        """
+        result = self._call('files_list_folder_longpoll', cursor, timeout=timeout)
+        return result.changes, result.backoff
     
-    def download_file(self, file_path):
+    def list_new_files(self, cursor):
         """
-        Download a file from Dropbox to a temporary file.
+        Consume the changes after cursor and count PDFs that were added or modified.
+        
+        Args:
+            cursor (str): Cursor to continue from
+            
+        Returns:
+            tuple: (new cursor, number of new or modified PDF files)
+        """
+        new_files = 0
+        while True:
+            result = self._call('files_list_folder_continue', cursor)
+            for entry in result.entries:
+                if isinstance(entry, FileMetadata) and entry.name.lower().endswith('.pdf'):
+                    new_files += 1
+            cursor = result.cursor
+            if not result.has_more:
+                return cursor, new_files
+    
+    def _load_list_state(self, folder_path, recursive):
+        """
+        Carrega o cursor e a última listagem persistidos para a pasta.
+        
+        Returns:
+            dict: Estado salvo, ou None se não existir ou for de outra pasta
+        """
+        try:
+            with open(LIST_STATE_FILE, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Estado de listagem ilegível em {LIST_STATE_FILE}: {str(e)}")
+            return None
+        
+        if state.get('folder') != folder_path.lower() or state.get('recursive') != recursive or not state.get('cursor'):
+            return None
+        try:
+            state['entries'] = {
+                path: FileEntry.from_dict(entry) for path, entry in state.get('entries', {}).items()
+            }
+        except (KeyError, TypeError, ValueError):
+            # Estado gravado por uma versão anterior, com menos metadados: refaz a listagem completa
+            return None
+        return state
+    
+    def _save_list_state(self, folder_path, recursive, cursor, entries):
+        """
+        Persiste o cursor e a listagem atual de forma atômica.
+        """
+        state = {
+            'folder': folder_path.lower(),
+            'recursive': recursive,
+            'cursor': cursor,
+            'entries': {path: entry.to_dict() for path, entry in entries.items()}
+        }
+        try:
+            os.makedirs(os.path.dirname(LIST_STATE_FILE) or '.', exist_ok=True)
+            temp_path = f"{LIST_STATE_FILE}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(temp_path, LIST_STATE_FILE)
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar o estado de listagem: {str(e)}")
+    
+    def download_file(self, file_path, max_memory=None, content_hash=None):
+        """
+        Download a file from Dropbox into a spooled temporary file.
+        
+        The response body is streamed in chunks. The file stays in memory up to
+        max_memory bytes and only then rolls over to disk; either way it is
+        removed as soon as the returned object is closed.
+        
+        When content_hash is given and the download cache holds that content,
+        the cached copy is opened instead and no request is made. On a miss the
+        stream is also written to the cache.
         
         Args:
             file_path (str): Path to the file in Dropbox
+            max_memory (int): In-memory threshold in bytes (defaults to DOWNLOAD_SPOOL_MAX_MEMORY)
+            content_hash (str): Dropbox content_hash of the file, as returned by list_files
             
         Returns:
-            file: A file-like object containing the downloaded file
+            file: A file-like object containing the downloaded file, positioned at the start
         """
+        if max_memory is None:
+            max_memory = DOWNLOAD_SPOOL_MAX_MEMORY
+        
+        cache_writer = None
+        if self.download_cache and content_hash:
+            cached_file = self.download_cache.open(content_hash)
+            if cached_file is not None:
+                logger.info(f"Using cached copy of file: {file_path}")
+                return cached_file
+            cache_writer = self.download_cache.writer(content_hash)
+        
         try:
             logger.info(f"Downloading file: {file_path}")
-            download_result = self.dbx.files_download(file_path)
+            download_result = self._call('files_download', file_path)
             
             if not download_result or len(download_result) < 2:
                 logger.error(f"Invalid download result for file {file_path}")
@@ -290,48 +980,225 @@ class DropboxHandler:
                 
             metadata, response = download_result
             
-            if not response or not hasattr(response, 'content'):
+            if not response or not hasattr(response, 'iter_content'):
                 logger.error(f"No content in response for file {file_path}")
                 raise ValueError(f"Failed to download file {file_path}: No content in response")
             
-            # Create a temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_file.write(response.content)
-            temp_file.flush()
-            temp_file.close()
+            spooled_file = tempfile.SpooledTemporaryFile(max_size=max_memory, suffix='.pdf')
+            received = 0
+            try:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if chunk:
+                        spooled_file.write(chunk)
+                        received += len(chunk)
+                        if cache_writer:
+                            cache_writer.write(chunk)
+                spooled_file.seek(0)
+            except Exception:
+                spooled_file.close()
+                raise
+            finally:
+                # Release the HTTP connection back to the pool
+                response.close()
+                metrics.record_bytes('download', received)
             
-            # Return an open file handle for reading
-            return open(temp_file.name, 'rb')
+            if cache_writer:
+                try:
+                    cache_writer.commit()
+                except Exception as e:
+                    # The download itself succeeded; a cache failure only costs a future re-download
+                    logger.warning(f"Could not cache file {file_path}: {str(e)}")
+                cache_writer = None
+            
+            return spooled_file
         except ApiError as e:
             logger.error(f"Error downloading file {file_path}: {str(e)}")
+            self._check_not_found(e, file_path)
             raise
         except Exception as e:
             logger.error(f"Unexpected error downloading file {file_path}: {str(e)}")
             raise
+        finally:
+            if cache_writer:
+                cache_writer.abort()
     
-    def upload_file(self, file_obj, destination_path):
+    def download_many(self, paths, max_workers=None, content_hashes=None):
+        """
+        Download several files concurrently using a bounded worker pool.
+        
+        A failure in one file does not cancel the others: each position of the
+        result holds either the downloaded file or the error raised for it.
+        
+        Args:
+            paths (list): Paths of the files in Dropbox
+            max_workers (int): Maximum concurrent downloads (defaults to DOWNLOAD_MAX_WORKERS)
+            content_hashes (list): Dropbox content_hash of each file, used for the download cache
+            
+        Returns:
+            list: (file_obj, error) tuples in the same order as paths; file_obj is None
+                when error is set
+        """
+        paths = list(paths)
+        if not paths:
+            return []
+        
+        if max_workers is None:
+            max_workers = DOWNLOAD_MAX_WORKERS
+        workers = max(1, min(int(max_workers), len(paths)))
+        
+        hashes = list(content_hashes) if content_hashes is not None else [None] * len(paths)
+        
+        def fetch(file_path, content_hash):
+            try:
+                return self.download_file(file_path, content_hash=content_hash), None
+            except Exception as e:
+                return None, e
+        
+        if workers == 1:
+            return [fetch(file_path, content_hash) for file_path, content_hash in zip(paths, hashes)]
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dropbox-download") as executor:
+            return list(executor.map(fetch, paths, hashes))
+    
+    def upload_file(self, file_obj, destination_path, chunk_size=None):
         """
         Upload a file to Dropbox.
         
+        Files larger than UPLOAD_SESSION_THRESHOLD are sent through an upload
+        session in chunks read directly from file_obj.
+        
         Args:
             file_obj (file): File-like object to upload
             destination_path (str): Destination path in Dropbox
+            chunk_size (int): Session chunk size in bytes (defaults to UPLOAD_CHUNK_SIZE)
             
         Returns:
             object: Metadata of the uploaded file
         """
         try:
             logger.info(f"Uploading file to: {destination_path}")
+            
+            # Determine the size without reading the whole stream
+            file_obj.seek(0, os.SEEK_END)
+            size = file_obj.tell()
             file_obj.seek(0)  # Ensure we're at the beginning of the file
-            return self.dbx.files_upload(
+            
+            if size > UPLOAD_SESSION_THRESHOLD:
+                return self._upload_in_session(file_obj, destination_path, size, chunk_size or UPLOAD_CHUNK_SIZE)
+            
+            result = self._call(
+                'files_upload',
                 file_obj.read(),
                 destination_path,
                 mode=WriteMode.overwrite
             )
+            metrics.record_bytes('upload', size)
+            return result
         except ApiError as e:
             logger.error(f"Error uploading file to {destination_path}: {str(e)}")
+            self._check_not_found(e, destination_path)
             raise
     
+    def _upload_in_session(self, file_obj, destination_path, size, chunk_size):
+        """
+        Upload a file with files_upload_session_start/append_v2/finish.
+        
+        A chunk that fails with a transient error is resent up to UPLOAD_CHUNK_RETRIES
+        times; if Dropbox reports a different offset the stream is repositioned there
+        instead of restarting the upload.
+        
+        Args:
+            file_obj (file): File-like object positioned at the start
+            destination_path (str): Destination path in Dropbox
+            size (int): Total size of the file in bytes
+            chunk_size (int): Chunk size in bytes
+            
+        Returns:
+            object: Metadata of the uploaded file
+        """
+        logger.info(f"Using upload session for {destination_path} ({size} bytes, chunks of {chunk_size} bytes)")
+        
+        first_chunk = file_obj.read(chunk_size)
+        session = self._send_upload_chunk(
+            'files_upload_session_start',
+            lambda: self._call('files_upload_session_start', first_chunk),
+            destination_path, 0
+        )
+        metrics.record_bytes('upload', len(first_chunk))
+        session_id = session.session_id
+        offset = len(first_chunk)
+        commit = CommitInfo(path=destination_path, mode=WriteMode.overwrite)
+        
+        while True:
+            file_obj.seek(offset)
+            chunk = file_obj.read(chunk_size)
+            cursor = UploadSessionCursor(session_id=session_id, offset=offset)
+            
+            try:
+                if offset + len(chunk) >= size:
+                    result = self._send_upload_chunk(
+                        'files_upload_session_finish',
+                        lambda: self._call('files_upload_session_finish', chunk, cursor, commit),
+                        destination_path, offset
+                    )
+                    metrics.record_bytes('upload', len(chunk))
+                    return result
+                
+                self._send_upload_chunk(
+                    'files_upload_session_append_v2',
+                    lambda: self._call('files_upload_session_append_v2', chunk, cursor),
+                    destination_path, offset
+                )
+                metrics.record_bytes('upload', len(chunk))
+                offset += len(chunk)
+            except ApiError as e:
+                # A retried chunk may already have been received: continue from where Dropbox is
+                correct_offset = self._get_correct_upload_offset(e)
+                if correct_offset is None or correct_offset == offset:
+                    raise
+                logger.warning(f"Upload session for {destination_path} expected offset {correct_offset}, not {offset}. Resuming from there")
+                offset = correct_offset
+    
+    def _send_upload_chunk(self, operation, send, destination_path, offset):
+        """
+        Send one upload session request, retrying transient failures.
+        
+        Args:
+            operation (str): Name of the Dropbox method called by send (for metrics)
+            send (callable): Performs the request
+            destination_path (str): Destination path in Dropbox (for logging)
+            offset (int): Offset of the chunk (for logging)
+            
+        Returns:
+            object: Result of the request
+        """
+        attempt = 0
+        while True:
+            try:
+                return send()
+            except (InternalServerError, requests.exceptions.RequestException) as e:
+                attempt += 1
+                if attempt > UPLOAD_CHUNK_RETRIES:
+                    raise
+                logger.warning(f"Chunk at offset {offset} for {destination_path} failed ({str(e)}). Retry {attempt}/{UPLOAD_CHUNK_RETRIES}")
+                metrics.record_retry(operation)
+                time.sleep(min(2 ** attempt, 30))
+    
+    @staticmethod
+    def _get_correct_upload_offset(api_error):
+        """
+        Extract the offset expected by Dropbox from an upload session error.
+        
+        Returns:
+            int: The correct offset, or None if the error is not an offset mismatch
+        """
+        error = getattr(api_error, 'error', None)
+        if error is not None and hasattr(error, 'is_lookup_failed') and error.is_lookup_failed():
+            error = error.get_lookup_failed()
+        if error is not None and hasattr(error, 'is_incorrect_offset') and error.is_incorrect_offset():
+            return error.get_incorrect_offset().correct_offset
+        return None
+    
     def move_file(self, from_path, to_path):
         """
         Move a file within Dropbox.
@@ -345,11 +1212,93 @@ class DropboxHandler:
         """
         try:
             logger.info(f"Moving file from {from_path} to {to_path}")
-            return self.dbx.files_move_v2(from_path, to_path, autorename=True)
+            return self._call('files_move_v2', from_path, to_path, autorename=True)
         except ApiError as e:
             logger.error(f"Error moving file from {from_path} to {to_path}: {str(e)}")
+            self._check_not_found(e, from_path)
             raise
     
+    def move_many(self, moves, batch_size=None):
+        """
+        Move several files within Dropbox using files_move_batch_v2.
+        
+        Moves are submitted in batches of batch_size entries with autorename enabled,
+        the same semantics as move_file. Batches processed asynchronously by Dropbox
+        are polled with files_move_batch_check_v2 until they finish.
+        
+        Args:
+            moves (list): (from_path, to_path) tuples
+            batch_size (int): Entries per batch (defaults to MOVE_BATCH_SIZE, max 1000)
+            
+        Returns:
+            list: (metadata, error) tuples in the same order as moves; metadata is None
+                when error is set
+        """
+        moves = list(moves)
+        if batch_size is None:
+            batch_size = MOVE_BATCH_SIZE
+        batch_size = max(1, min(int(batch_size), 1000))
+        
+        results = []
+        for start in range(0, len(moves), batch_size):
+            batch = moves[start:start + batch_size]
+            logger.info(f"Moving batch of {len(batch)} files ({start + len(batch)}/{len(moves)})")
+            
+            try:
+                entries = [RelocationPath(from_path=from_path, to_path=to_path) for from_path, to_path in batch]
+                launch = self._call('files_move_batch_v2', entries, autorename=True)
+                
+                if launch.is_complete():
+                    batch_result = launch.get_complete()
+                else:
+                    batch_result = self._wait_for_move_batch(launch.get_async_job_id())
+                
+                if len(batch_result.entries) != len(batch):
+                    logger.error(f"Batch move returned {len(batch_result.entries)} results for {len(batch)} files")
+                
+                for (from_path, to_path), entry in zip(batch, batch_result.entries):
+                    if entry.is_success():
+                        results.append((entry.get_success(), None))
+                    else:
+                        failure = entry.get_failure() if entry.is_failure() else None
+                        logger.error(f"Error moving file from {from_path} to {to_path}: {str(failure)}")
+                        error = ApiError(None, failure, None, None)
+                        self._check_not_found(error, from_path)
+                        results.append((None, error))
+                
+                # Moves without a result entry cannot be assumed done
+                for from_path, _ in batch[len(batch_result.entries):]:
+                    results.append((None, RuntimeError(f"No result returned for the move of {from_path}")))
+            except Exception as e:
+                logger.error(f"Error moving batch of {len(batch)} files: {str(e)}")
+                results.extend((None, e) for _ in batch[len(results) - start:])
+        
+        return results
+    
+    def _wait_for_move_batch(self, async_job_id):
+        """
+        Poll files_move_batch_check_v2 until a batch move finishes.
+        
+        Args:
+            async_job_id (str): Job id returned by files_move_batch_v2
+            
+        Returns:
+            RelocationBatchV2Result: Result with one entry per submitted move
+        """
+        deadline = time.monotonic() + MOVE_BATCH_TIMEOUT
+        interval = 0.5
+        
+        while True:
+            status = self._call('files_move_batch_check_v2', async_job_id)
+            if status.is_complete():
+                return status.get_complete()
+            
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Move batch job {async_job_id} did not finish in {MOVE_BATCH_TIMEOUT} seconds")
+            
+            time.sleep(interval)
+            interval = min(interval * 2, 5)
+    
     def create_folder_if_not_exists(self, folder_path):
         """
         Create a folder in Dropbox if it doesn't exist.
@@ -362,14 +1311,14 @@ class DropboxHandler:
         """
         try:
             # Check if folder exists
-            self.dbx.files_get_metadata(folder_path)
+            self._call('files_get_metadata', folder_path)
             logger.info(f"Folder {folder_path} already exists")
             return True
         except ApiError as e:
             # If folder doesn't exist, create it
             if e.error.is_path() and e.error.get_path().is_not_found():
                 try:
-                    self.dbx.files_create_folder_v2(folder_path)
+                    self._call('files_create_folder_v2', folder_path)
                     logger.info(f"Created folder: {folder_path}")
                     return True
                 except ApiError as create_error:
@@ -387,31 +1336,7 @@ class DropboxHandler:
         Returns:
             str: Path to the output folder or None if not found
         """
-        # Use as configurações do config.py
-        base_folder = DROPBOX_BASE_FOLDER
-        output_folder_name = DROPBOX_OUTPUT_FOLDER_NAME
-        target_path = DROPBOX_OUTPUT_PATH
-        
-        try:
-            # Verifica se a pasta base existe
-            try:
-                self.dbx.files_get_metadata(base_folder)
-            except ApiError:
-                logger.error(f"Pasta base '{base_folder}' não encontrada no Dropbox ao procurar pasta de saída.")
-                return None
-                
-            # Verifica se a pasta alvo existe dentro da pasta base
-            try:
-                self.dbx.files_get_metadata(target_path)
-                logger.info(f"Pasta de saída encontrada em: {target_path}")
-                return target_path
-            except ApiError:
-                logger.error(f"Pasta '{output_folder_name}' não encontrada dentro de '{base_folder}'")
-        except Exception as e:
-            logger.error(f"Erro ao buscar pasta de saída: {str(e)}")
-        
-        logger.error(f"Pasta '{output_folder_name}' não encontrada no Dropbox. Esta pasta deve existir em '{base_folder}'.")
-        return None
+        return self._resolve_folders().get('output')
     
     def get_processed_folder_path(self):
         """
@@ -421,39 +1346,4 @@ class DropboxHandler:
         Returns:
             str: Path to the processed folder or None if it can't be created
         """
-        # Use as configurações do config.py
-        base_folder = DROPBOX_BASE_FOLDER
-        processed_folder_name = DROPBOX_PROCESSED_FOLDER_NAME
-        target_path = DROPBOX_PROCESSED_PATH
-        
-        try:
-            # Verifica se a pasta base existe
-            try:
-                self.dbx.files_get_metadata(base_folder)
-            except ApiError:
-                logger.error(f"Pasta base '{base_folder}' não encontrada no Dropbox ao procurar/criar pasta de processados.")
-                return None
-                
-            # Verifica se a pasta de processados já existe
-            try:
-                self.dbx.files_get_metadata(target_path)
-                logger.info(f"Pasta de processados encontrada em: {target_path}")
-                return target_path
-            except ApiError as e:
-                # Se a pasta não existir, tenta criá-la
-                if e.error.is_path() and e.error.get_path().is_not_found():
-                    try:
-                        logger.info(f"Criando pasta de processados em: {target_path}")
-                        self.dbx.files_create_folder_v2(target_path)
-                        logger.info(f"Pasta criada com sucesso: {target_path}")
-                        return target_path
-                    except ApiError as create_error:
-                        logger.error(f"Erro ao criar pasta de processados: {str(create_error)}")
-                        return None
-                else:
-                    logger.error(f"Erro ao verificar pasta de processados: {str(e)}")
-                    return None
-        except Exception as e:
-            logger.error(f"Erro ao procurar/criar pasta de processados: {str(e)}")
-            
-        return None
+        return self._resolve_folders().get('processed')
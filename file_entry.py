@@ -0,0 +1,79 @@
+from datetime import datetime
+
+
+class FileEntry:
+    """
+    Metadados de um arquivo da listagem do Dropbox.
+
+    Usa __slots__ para ocupar bem menos memória que um dicionário por arquivo
+    e mantém tudo o que as etapas seguintes precisam (tamanho, revisão e
+    content_hash), evitando novas consultas à API.
+    """
+
+    __slots__ = ('id', 'path', 'size', 'rev', 'content_hash', 'server_modified')
+
+    def __init__(self, id, path, size, rev, content_hash, server_modified):
+        """
+        Args:
+            id (str): Identificador do arquivo no Dropbox (id:...)
+            path (str): Caminho de exibição (path_display)
+            size (int): Tamanho em bytes
+            rev (str): Revisão do arquivo
+            content_hash (str): content_hash do Dropbox
+            server_modified (datetime): Última modificação no servidor
+        """
+        self.id = id
+        self.path = path
+        self.size = size
+        self.rev = rev
+        self.content_hash = content_hash
+        self.server_modified = server_modified
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        """Cria a entrada a partir de um dropbox.files.FileMetadata."""
+        return cls(
+            metadata.id,
+            metadata.path_display,
+            metadata.size,
+            metadata.rev,
+            metadata.content_hash,
+            metadata.server_modified
+        )
+
+    @property
+    def name(self):
+        """Nome do arquivo, sem a pasta."""
+        return self.path.rsplit('/', 1)[-1]
+
+    def to_dict(self):
+        """Representação serializável em JSON."""
+        return {
+            'id': self.id,
+            'path': self.path,
+            'size': self.size,
+            'rev': self.rev,
+            'content_hash': self.content_hash,
+            'server_modified': self.server_modified.isoformat() if self.server_modified else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Recria a entrada a partir de to_dict.
+
+        Raises:
+            KeyError: Se faltar algum campo (ex.: estado gravado por uma versão anterior)
+        """
+        server_modified = data['server_modified']
+        return cls(
+            data['id'],
+            data['path'],
+            data['size'],
+            data['rev'],
+            data['content_hash'],
+            datetime.fromisoformat(server_modified) if server_modified else None
+        )
+
+    def __repr__(self):
+        return f"FileEntry({self.path!r}, size={self.size}, rev={self.rev!r})"
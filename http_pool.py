@@ -0,0 +1,65 @@
+from dropbox.dropbox_client import create_session
+from dropbox.session import API_CONTENT_HOST, API_NOTIFICATION_HOST
+from config import HTTP_POOL_RPC_CONNECTIONS, HTTP_POOL_CONTENT_CONNECTIONS, HTTP_POOL_NOTIFY_CONNECTIONS
+
+
+def create_pooled_session(rpc_connections=None, content_connections=None, notify_connections=None):
+    """
+    Cria a sessão HTTP compartilhada pelo cliente do Dropbox, com um pool de
+    conexões persistentes (keep-alive) por tipo de endpoint.
+
+    Chamadas RPC (api.dropboxapi.com), transferências (content.dropboxapi.com) e
+    longpoll (notify.dropboxapi.com) usam pools separados: downloads longos não
+    ocupam as conexões das chamadas de metadados e vice-versa. Com pools do
+    tamanho da concorrência, cada conexão TLS é reaproveitada em vez de ser
+    descartada ao fim da requisição.
+
+    Args:
+        rpc_connections (int): Conexões do pool RPC (padrão: HTTP_POOL_RPC_CONNECTIONS)
+        content_connections (int): Conexões do pool de conteúdo (padrão: HTTP_POOL_CONTENT_CONNECTIONS)
+        notify_connections (int): Conexões do pool de longpoll (padrão: HTTP_POOL_NOTIFY_CONNECTIONS)
+
+    Returns:
+        requests.Session: Sessão para Dropbox(session=...)
+    """
+    session = create_session(max_connections=rpc_connections or HTTP_POOL_RPC_CONNECTIONS)
+    for host, connections in (
+        (API_CONTENT_HOST, content_connections or HTTP_POOL_CONTENT_CONNECTIONS),
+        (API_NOTIFICATION_HOST, notify_connections or HTTP_POOL_NOTIFY_CONNECTIONS),
+    ):
+        # Adaptador com a mesma validação de certificados do SDK, montado só para o host
+        adapter = create_session(max_connections=connections).get_adapter('https://')
+        session.mount(f'https://{host}', adapter)
+    return session
+
+
+def connection_stats(session):
+    """
+    Reaproveitamento de conexões por host desde a criação da sessão.
+
+    Args:
+        session (requests.Session): Sessão criada por create_pooled_session
+
+    Returns:
+        dict: Por host, requests (requisições), connections (conexões abertas,
+            cada uma com um handshake TLS) e reuse_ratio (fração das requisições
+            que usaram uma conexão já aberta)
+    """
+    stats = {}
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+        if pools is None:
+            continue
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = stats.setdefault(pool.host, {'requests': 0, 'connections': 0})
+            host['requests'] += pool.num_requests
+            host['connections'] += pool.num_connections
+
+    for host in stats.values():
+        requests = host['requests']
+        host['reuse_ratio'] = round(1 - min(host['connections'], requests) / requests, 4) if requests else None
+    return stats
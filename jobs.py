@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from locks import FileLock
+from logger import get_logger
+from config import (
+    JOB_MAX_WORKERS,
+    JOB_MAX_PENDING,
+    JOB_HISTORY_SIZE,
+    JOBS_DIR,
+    RUN_LOCK_FILE,
+    RUN_STATE_FILE,
+    RUN_STATE_LOCK_FILE
+)
+
+logger = get_logger()
+
+# Estados possíveis de um job
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Intervalo mínimo entre gravações do progresso de um job em disco
+SAVE_INTERVAL_SECONDS = 1.0
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _write_json(path, data):
+    """Grava um arquivo JSON de forma atômica."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def _read_json(path):
+    """Lê um arquivo JSON, retornando None se não existir ou estiver ilegível."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    """Verifica se um processo ainda existe."""
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # No Windows o servidor (Waitress) roda em um único processo
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Job:
+    """
+    Um processamento enfileirado, com progresso atualizado durante a execução.
+
+    Também serve de rastreador de progresso para PDFProcessor (métodos update e increment).
+    O estado é gravado em JOBS_DIR para que qualquer worker possa consultá-lo.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.progress = {
+            'stage': None,            # Etapa atual (listing, processing, ...)
+            'groups_total': 0,        # Grupos de CPF a processar
+            'groups_done': 0,         # Grupos concluídos (com sucesso ou não)
+            'bytes_downloaded': 0,
+            'bytes_uploaded': 0,
+            'stages': {}              # Grupos que já passaram por cada etapa do pipeline
+        }
+        self._lock = threading.Lock()
+        self._last_save = 0
+
+    @property
+    def path(self):
+        return os.path.join(JOBS_DIR, f"{self.id}.json")
+
+    def update(self, **fields):
+        """Define campos de progresso (ex.: stage='listing')."""
+        with self._lock:
+            self.progress.update(fields)
+        self.save(force='stage' in fields)
+
+    def increment(self, stage=None, **counters):
+        """
+        Incrementa contadores de progresso.
+
+        Args:
+            stage (str): Etapa do pipeline concluída por mais um grupo
+            **counters: Contadores a somar (ex.: bytes_downloaded=1024)
+        """
+        with self._lock:
+            for name, value in counters.items():
+                self.progress[name] = self.progress.get(name, 0) + value
+            if stage:
+                stages = self.progress['stages']
+                stages[stage] = stages.get(stage, 0) + 1
+        self.save()
+
+    @property
+    def finished(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self):
+        """Representação serializável em JSON do job."""
+        with self._lock:
+            progress = dict(self.progress)
+            progress['stages'] = dict(self.progress['stages'])
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': progress,
+            'result': self.result,
+            'error': self.error,
+            'pid': os.getpid()
+        }
+
+    def save(self, force=False):
+        """
+        Grava o estado do job em disco, no máximo uma vez por SAVE_INTERVAL_SECONDS
+        a menos que force seja True.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_save < SAVE_INTERVAL_SECONDS:
+            return
+        self._last_save = now
+        try:
+            _write_json(self.path, self.to_dict())
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o estado do job {self.id}: {str(e)}")
+
+
+class JobManager:
+    """
+    Executa jobs de processamento em um pool de threads limitado e guarda
+    o histórico dos jobs mais recentes.
+
+    Os disparos são coordenados entre processos (workers do Gunicorn): existe no
+    máximo um processamento ativo e um processamento seguinte na fila. Um disparo
+    feito enquanto o ativo ainda não começou, ou quando já existe um seguinte,
+    é anexado a esse job em vez de criar uma execução duplicada.
+    """
+
+    def __init__(self, run_job, max_workers=None, max_pending=None, history_size=None):
+        """
+        Args:
+            run_job (callable): Recebe o Job, executa o processamento e retorna o resultado;
+                exceções marcam o job como falho
+            max_workers (int): Jobs executados simultaneamente neste processo
+            max_pending (int): Jobs aguardando execução antes de recusar novos
+            history_size (int): Jobs concluídos mantidos para consulta
+        """
+        self.run_job = run_job
+        self.max_pending = JOB_MAX_PENDING if max_pending is None else max_pending
+        self.history_size = JOB_HISTORY_SIZE if history_size is None else history_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=JOB_MAX_WORKERS if max_workers is None else max_workers,
+            thread_name_prefix="job"
+        )
+        self._jobs = OrderedDict()
+        self._lock = threading.RLock()
+
+    def submit(self):
+        """
+        Dispara um processamento, reaproveitando o job em andamento quando possível.
+
+        Returns:
+            tuple: (job_id, anexado) onde anexado é True se o disparo foi associado a
+                um job já existente; (None, False) se a fila estiver cheia
+        """
+        with self._lock, FileLock(RUN_STATE_LOCK_FILE):
+            state = self._read_state()
+
+            # Ainda não começou: quem disparar agora será atendido por ele
+            for slot in ('next', 'active'):
+                entry = state.get(slot)
+                if entry and (slot == 'next' or self._status_of(entry['job_id']) == QUEUED):
+                    logger.info(f"Disparo anexado ao job {entry['job_id']} já na fila")
+                    return entry['job_id'], True
+
+            pending = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if pending >= self.max_pending:
+                return None, False
+
+            job = Job()
+            job.save(force=True)
+            self._jobs[job.id] = job
+            self._trim()
+
+            # Com um job ativo em execução, o novo fica como o próximo
+            slot = 'next' if state.get('active') else 'active'
+            state[slot] = {'job_id': job.id, 'pid': os.getpid()}
+            self._write_state(state)
+
+        self._executor.submit(self._execute, job)
+        logger.info(f"Job {job.id} enfileirado")
+        return job.id, False
+
+    def get_status(self, job_id):
+        """
+        Returns:
+            dict: Estado do job (de qualquer processo), ou None se desconhecido
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return _read_json(os.path.join(JOBS_DIR, f"{os.path.basename(job_id)}.json"))
+
+    def wait(self, job_id, timeout=None, interval=0.5):
+        """
+        Aguarda o término de um job.
+
+        Returns:
+            dict: Estado final do job, ou o estado atual se o timeout expirar
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.get_status(job_id)
+            if status is None or status['status'] in (SUCCEEDED, FAILED):
+                return status
+            if status['status'] == QUEUED and not _pid_alive(status.get('pid', os.getpid())):
+                return status
+            if deadline is not None and time.monotonic() >= deadline:
+                return status
+            time.sleep(interval)
+
+    def _status_of(self, job_id):
+        status = self.get_status(job_id)
+        return status['status'] if status else None
+
+    def _read_state(self):
+        """
+        Lê o estado compartilhado, descartando entradas de processos que não existem mais.
+        Deve ser chamada com self._lock e, depois dele, o lock de RUN_STATE_LOCK_FILE
+        adquiridos, sempre nessa ordem: a consulta aos jobs usa self._lock, e a ordem
+        inversa em outra thread causaria um deadlock.
+        """
+        state = _read_json(RUN_STATE_FILE) or {}
+        for slot in ('active', 'next'):
+            entry = state.get(slot)
+            if not entry:
+                continue
+            pid = entry.get('pid')
+            orphan = pid == os.getpid() and entry.get('job_id') not in self._jobs
+            if orphan or not _pid_alive(pid) or self._status_of(entry['job_id']) in (SUCCEEDED, FAILED, None):
+                state[slot] = None
+        return state
+
+    def _write_state(self, state):
+        _write_json(RUN_STATE_FILE, state)
+
+    def _trim(self):
+        # Remove os jobs concluídos mais antigos além do limite do histórico
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            job = self._jobs.pop(job_id)
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+
+    def _execute(self, job):
+        # Apenas um processamento por vez entre todos os processos
+        run_lock = FileLock(RUN_LOCK_FILE)
+        try:
+            run_lock.acquire()
+
+            with self._lock, FileLock(RUN_STATE_LOCK_FILE):
+                state = self._read_state()
+                if (state.get('next') or {}).get('job_id') == job.id:
+                    state['active'], state['next'] = state['next'], None
+                    self._write_state(state)
+
+            job.status = RUNNING
+            job.started_at = _now()
+            job.save(force=True)
+            logger.info(f"Job {job.id} iniciado")
+
+            job.result = self.run_job(job)
+            job.status = SUCCEEDED
+        except Exception as e:
+            logger.error(f"Job {job.id} falhou: {str(e)}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = _now()
+            job.update(stage='done')
+
+            with self._lock, FileLock(RUN_STATE_LOCK_FILE):
+                state = _read_json(RUN_STATE_FILE) or {}
+                if (state.get('active') or {}).get('job_id') == job.id:
+                    state['active'] = None
+                    self._write_state(state)
+            run_lock.release()
+
+            with self._lock:
+                self._trim()
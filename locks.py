@@ -0,0 +1,82 @@
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Lock exclusivo entre processos baseado em um arquivo local.
+
+    Usa flock no Linux/Mac e msvcrt.locking no Windows. O lock é liberado
+    automaticamente pelo sistema operacional se o processo terminar.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Caminho do arquivo de lock (criado se não existir)
+        """
+        self.path = path
+        self._file = None
+
+    @property
+    def locked(self):
+        """True se este objeto detém o lock."""
+        return self._file is not None
+
+    def acquire(self, blocking=True):
+        """
+        Adquire o lock.
+
+        Args:
+            blocking (bool): Se False, retorna imediatamente caso outro processo detenha o lock
+
+        Returns:
+            bool: True se o lock foi adquirido
+        """
+        if self._file is not None:
+            return True
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        lock_file = open(self.path, 'a+')
+        try:
+            if fcntl:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(lock_file.fileno(), flags)
+            else:
+                lock_file.seek(0)
+                mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                msvcrt.locking(lock_file.fileno(), mode, 1)
+        except OSError:
+            lock_file.close()
+            if blocking:
+                raise
+            return False
+
+        self._file = lock_file
+        return True
+
+    def release(self):
+        """Libera o lock, se estiver adquirido."""
+        if self._file is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -1,4 +1,4 @@
-from app import app, init_dropbox, init_pdf_processor, logger
+from app import app, init_dropbox, init_pdf_processor, start_watcher, logger
 
 if __name__ == "__main__":
     # Inicializar o Dropbox e o processador de PDF
@@ -8,5 +8,7 @@ if __name__ == "__main__":
         logger.error("Falha ao inicializar os componentes necessários. Verifique os logs para mais detalhes.")
         exit(1)
     
+    start_watcher()
+    
     # Iniciar o servidor Flask
     app.run(host="0.0.0.0", port=5000, debug=False)  # Desabilitado debug para evitar reinicializações
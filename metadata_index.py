@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from logger import get_logger
+from config import METADATA_INDEX_FILE
+
+logger = get_logger()
+
+# Estados de processamento de um arquivo
+PENDING = "pending"
+MERGED = "merged"
+UPLOADED = "uploaded"
+MOVED = "moved"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path_lower TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    id TEXT,
+    rev TEXT,
+    content_hash TEXT,
+    cpf TEXT,
+    size INTEGER,
+    server_modified TEXT,
+    state TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_cpf ON files (cpf);
+CREATE INDEX IF NOT EXISTS files_state ON files (state);
+"""
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class MetadataIndex:
+    """
+    Índice local (SQLite) dos arquivos da pasta de origem e do estado de
+    processamento de cada um (pending, merged, uploaded, moved).
+
+    O banco fica em disco e pode ser consultado por qualquer worker sem acessar
+    o Dropbox. Cada thread usa sua própria conexão.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): Arquivo do banco (padrão: METADATA_INDEX_FILE)
+        """
+        self.path = path or METADATA_INDEX_FILE
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL permite leituras dos outros workers durante a gravação de uma execução
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def sync_listing(self, entries, cpf_of):
+        """
+        Atualiza o índice com a listagem atual da pasta de origem.
+
+        Arquivos novos ou com revisão diferente voltam para pending; arquivos que
+        saíram da pasta sem terem sido movidos pelo processamento são removidos.
+
+        Args:
+            entries (list): FileEntry da listagem
+            cpf_of (callable): Retorna o CPF de uma entrada, ou None
+        """
+        now = _now()
+        rows = [
+            (
+                entry.path.lower(),
+                entry.path,
+                entry.id,
+                entry.rev,
+                entry.content_hash,
+                cpf_of(entry),
+                entry.size,
+                entry.server_modified.isoformat() if entry.server_modified else None,
+                PENDING,
+                now
+            )
+            for entry in entries
+        ]
+        listed = {row[0] for row in rows}
+
+        with self._connection() as conn:
+            known = conn.execute("SELECT path_lower FROM files WHERE state != ?", (MOVED,)).fetchall()
+            gone = [(row['path_lower'],) for row in known if row['path_lower'] not in listed]
+            conn.executemany("DELETE FROM files WHERE path_lower = ?", gone)
+
+            # Um arquivo na pasta de origem nunca está movido; revisão nova reinicia o estado
+            conn.executemany(
+                """
+                INSERT INTO files (path_lower, path, id, rev, content_hash, cpf, size,
+                                   server_modified, state, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path_lower) DO UPDATE SET
+                    path = excluded.path,
+                    id = excluded.id,
+                    content_hash = excluded.content_hash,
+                    cpf = excluded.cpf,
+                    size = excluded.size,
+                    server_modified = excluded.server_modified,
+                    state = CASE
+                        WHEN files.rev IS NOT excluded.rev OR files.state = 'moved' THEN excluded.state
+                        ELSE files.state
+                    END,
+                    updated_at = CASE
+                        WHEN files.rev IS NOT excluded.rev OR files.state = 'moved' THEN excluded.updated_at
+                        ELSE files.updated_at
+                    END,
+                    rev = excluded.rev
+                """,
+                rows
+            )
+
+    def set_state(self, paths, state):
+        """
+        Define o estado de processamento de arquivos.
+
+        Args:
+            paths (list): Caminhos no Dropbox (path_display)
+            state (str): PENDING, MERGED, UPLOADED ou MOVED
+        """
+        now = _now()
+        with self._connection() as conn:
+            conn.executemany(
+                "UPDATE files SET state = ?, updated_at = ? WHERE path_lower = ?",
+                [(state, now, path.lower()) for path in paths]
+            )
+
+    def cpfs_in_state(self, state):
+        """
+        CPFs cujos arquivos ainda não movidos estão todos no mesmo estado.
+
+        Como sync_listing devolve para pending os arquivos com revisão nova, um CPF
+        com todos os arquivos em UPLOADED tem o PDF unido já enviado com o conteúdo
+        atual dos comprovantes.
+
+        Args:
+            state (str): PENDING, MERGED ou UPLOADED
+
+        Returns:
+            set: CPFs nesse estado
+        """
+        rows = self._connection().execute(
+            """
+            SELECT cpf FROM files
+            WHERE state != ? AND cpf IS NOT NULL
+            GROUP BY cpf HAVING MIN(state) = ? AND MAX(state) = ?
+            """,
+            (MOVED, state, state)
+        ).fetchall()
+        return {row['cpf'] for row in rows}
+
+    def pending_for(self, cpf):
+        """
+        Arquivos de um CPF ainda não movidos, com seus estados.
+
+        Returns:
+            list: Dicionários com path, size, rev, content_hash, state e updated_at
+        """
+        rows = self._connection().execute(
+            """
+            SELECT path, size, rev, content_hash, server_modified, state, updated_at FROM files
+            WHERE cpf = ? AND state != ?
+            ORDER BY path
+            """,
+            (cpf, MOVED)
+        ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import atexit
+import weakref
+import threading
+from dropbox.exceptions import RateLimitError
+from http_pool import connection_stats
+from logger import get_logger
+from config import METRICS_ENABLED, METRICS_DIR, METRICS_FLUSH_INTERVAL
+
+logger = get_logger()
+
+# Limites (segundos) dos buckets do histograma de latência das chamadas
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Métricas expostas: nome -> (tipo, descrição)
+_METRICS = {
+    'dropbox_api_requests_total': (
+        'counter', 'Chamadas à API do Dropbox por método e resultado (ok, rate_limited, error)'),
+    'dropbox_api_request_duration_seconds': (
+        'histogram', 'Latência das chamadas à API do Dropbox por método'),
+    'dropbox_api_retries_total': (
+        'counter', 'Novas tentativas de chamadas à API do Dropbox após falhas temporárias'),
+    'dropbox_transfer_bytes_total': (
+        'counter', 'Bytes transferidos com o Dropbox por direção (download, upload)'),
+    'dropbox_http_requests_total': (
+        'counter', 'Requisições HTTP ao Dropbox por host'),
+    'dropbox_http_connections_total': (
+        'counter', 'Conexões HTTP (handshakes TLS) abertas com o Dropbox por host'),
+}
+
+
+def _label_key(labels):
+    """Chave estável (e serializável em JSON) de um conjunto de rótulos."""
+    return json.dumps(sorted(labels.items()), separators=(',', ':'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Contadores e histogramas do processo, no formato de exposição do Prometheus.
+
+    Cada processo (worker do gunicorn) grava periodicamente seus valores em
+    METRICS_DIR/metrics_<pid>_<início>.json; collect() soma os arquivos de todos
+    os processos, de modo que qualquer worker responde /metrics com o total. O
+    instante de início no nome impede que um processo novo com o PID reutilizado
+    de um worker encerrado sobrescreva os totais dele. Os arquivos de processos
+    encerrados são mantidos de propósito, para que os contadores nunca diminuam.
+
+    Uma thread por processo grava os valores alterados a cada flush_interval
+    segundos, mesmo que o processo fique ocioso depois das últimas chamadas.
+    """
+
+    def __init__(self, directory=None, flush_interval=None):
+        """
+        Args:
+            directory (str): Pasta dos arquivos por processo (padrão: METRICS_DIR)
+            flush_interval (float): Intervalo mínimo (segundos) entre gravações (padrão: METRICS_FLUSH_INTERVAL)
+        """
+        self.directory = directory or METRICS_DIR
+        self.flush_interval = METRICS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._started = time.time_ns()
+        self._last_flush = 0.0
+        self._dirty = False   # Valores alterados desde a última gravação
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._flusher = None
+        self._flusher_pid = None
+        if hasattr(os, 'register_at_fork'):
+            # Uma thread do pai pode estar com o lock no momento do fork
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def add_collector(self, collector):
+        """
+        Registra uma função chamada antes de cada gravação, para atualizar
+        valores mantidos fora do registro (ex.: com set_counter).
+        """
+        self._collectors.append(collector)
+
+    def _check_fork(self):
+        """
+        Um processo filho (gunicorn com preload) herda os valores do pai, que já
+        são gravados no arquivo do pai: recomeça do zero. Chamar com _lock adquirido.
+        """
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._started = time.time_ns()
+            self._last_flush = 0.0
+            self._dirty = False
+            self._counters = {}
+            self._histograms = {}
+
+    def start_flusher(self):
+        """
+        Inicia a thread que grava os valores alterados a cada flush_interval
+        segundos. Chamada de novo após um fork, inicia uma thread no processo atual.
+        """
+        if self._flusher is not None and self._flusher.is_alive() and self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(max(self.flush_interval, 0.1))
+            if self._dirty:
+                self.flush()
+
+    def _changed(self):
+        """Marca valores não gravados e grava se o intervalo já passou. Chamar com _lock adquirido."""
+        self._dirty = True
+        if self._flusher_pid != self._pid:
+            self.start_flusher()
+        return time.monotonic() - self._last_flush >= self.flush_interval
+
+    def inc(self, name, labels, value=1):
+        """Incrementa um contador."""
+        key = _label_key(labels)
+        with self._lock:
+            self._check_fork()
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            flush = self._changed()
+        if flush:
+            self.flush()
+
+    def set_counter(self, name, labels, value):
+        """Define o valor de um contador acumulado fora do registro."""
+        key = _label_key(labels)
+        with self._lock:
+            self._check_fork()
+            series = self._counters.setdefault(name, {})
+            if series.get(key) != value:
+                series[key] = value
+                self._dirty = True
+
+    def observe(self, name, value, labels):
+        """Registra uma observação em um histograma de latência."""
+        key = _label_key(labels)
+        with self._lock:
+            self._check_fork()
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+            flush = self._changed()
+        if flush:
+            self.flush()
+
+    def _path(self):
+        return os.path.join(self.directory, f"metrics_{self._pid}_{self._started}.json")
+
+    def flush(self):
+        """Grava os valores deste processo para que os outros workers os somem."""
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Falha ao coletar métricas: {str(e)}")
+        with self._lock:
+            self._check_fork()
+            self._last_flush = time.monotonic()
+            self._dirty = False
+            snapshot = json.dumps({'counters': self._counters, 'histograms': self._histograms})
+            path = self._path()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(snapshot)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar as métricas: {str(e)}")
+
+    def collect(self):
+        """
+        Soma os valores de todos os processos.
+
+        Returns:
+            tuple: (counters, histograms) no mesmo formato dos valores de um processo
+        """
+        self.flush()
+        counters = {}
+        histograms = {}
+        try:
+            names = [name for name in os.listdir(self.directory)
+                     if name.startswith('metrics_') and name.endswith('.json')]
+        except FileNotFoundError:
+            names = []
+
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            for metric, series in data.get('counters', {}).items():
+                totals = counters.setdefault(metric, {})
+                for key, value in series.items():
+                    totals[key] = totals.get(key, 0) + value
+
+            for metric, series in data.get('histograms', {}).items():
+                totals = histograms.setdefault(metric, {})
+                for key, histogram in series.items():
+                    total = totals.get(key)
+                    if total is None:
+                        total = totals[key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+                    for i, count in enumerate(histogram['buckets'][:len(LATENCY_BUCKETS)]):
+                        total['buckets'][i] += count
+                    total['sum'] += histogram['sum']
+                    total['count'] += histogram['count']
+
+        return counters, histograms
+
+    def render(self):
+        """
+        Returns:
+            str: Métricas de todos os processos no formato de texto do Prometheus
+        """
+        counters, histograms = self.collect()
+        lines = []
+        for metric, (kind, description) in _METRICS.items():
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} {kind}")
+
+            if kind == 'counter':
+                for key, value in sorted(counters.get(metric, {}).items()):
+                    lines.append(f"{metric}{_format_labels(json.loads(key))} {_format_value(value)}")
+                continue
+
+            for key, histogram in sorted(histograms.get(metric, {}).items()):
+                pairs = json.loads(key)
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram['buckets']):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_format_labels(pairs + [['le', repr(bound)]])} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(pairs + [['le', '+Inf']])} {histogram['count']}")
+                lines.append(f"{metric}_sum{_format_labels(pairs)} {_format_value(histogram['sum'])}")
+                lines.append(f"{metric}_count{_format_labels(pairs)} {histogram['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+
+# Registro do processo, usado pela instrumentação do DropboxHandler
+registry = MetricsRegistry()
+
+if METRICS_ENABLED:
+    atexit.register(registry.flush)
+
+
+def flush():
+    """Grava as métricas deste processo agora (ex.: ao fim de um processamento)."""
+    if METRICS_ENABLED:
+        registry.flush()
+
+
+def start_flusher():
+    """Inicia a gravação periódica das métricas no processo atual (ex.: em um worker recém-criado)."""
+    if METRICS_ENABLED:
+        registry.start_flusher()
+
+
+def record_call(operation, seconds, error=None):
+    """
+    Registra uma chamada à API do Dropbox. Compatível com
+    DropboxHandler.add_call_listener.
+    """
+    if not METRICS_ENABLED:
+        return
+    if error is None:
+        status = 'ok'
+    elif isinstance(error, RateLimitError):
+        status = 'rate_limited'
+    else:
+        status = 'error'
+    registry.observe('dropbox_api_request_duration_seconds', seconds, {'method': operation})
+    registry.inc('dropbox_api_requests_total', {'method': operation, 'status': status})
+
+
+def record_retry(operation):
+    """Registra uma nova tentativa de uma chamada à API do Dropbox."""
+    if METRICS_ENABLED:
+        registry.inc('dropbox_api_retries_total', {'method': operation})
+
+
+def record_bytes(direction, count):
+    """
+    Soma bytes transferidos com o Dropbox.
+
+    Args:
+        direction (str): 'download' ou 'upload'
+        count (int): Número de bytes
+    """
+    if METRICS_ENABLED and count:
+        registry.inc('dropbox_transfer_bytes_total', {'direction': direction}, count)
+
+
+# Sessões HTTP do cliente do Dropbox cujas conexões são contadas (sem impedir a coleta delas)
+_sessions = weakref.WeakSet()
+
+
+def track_session(session):
+    """
+    Inclui as requisições e conexões de uma sessão HTTP nas métricas.
+
+    Args:
+        session (requests.Session): Sessão criada por http_pool.create_pooled_session
+    """
+    if METRICS_ENABLED:
+        _sessions.add(session)
+
+
+def _collect_connections():
+    totals = {}
+    for session in list(_sessions):
+        for host, counts in connection_stats(session).items():
+            total = totals.setdefault(host, [0, 0])
+            total[0] += counts['requests']
+            total[1] += counts['connections']
+    for host, (requests, connections) in totals.items():
+        registry.set_counter('dropbox_http_requests_total', {'host': host}, requests)
+        registry.set_counter('dropbox_http_connections_total', {'host': host}, connections)
+
+
+registry.add_collector(_collect_connections)
@@ -1,30 +1,324 @@
 import os
-import re
 import io
 import string
+import shutil
 import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.filters import FlateDecode
+from PyPDF2.generic import (
+    EncodedStreamObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    StreamObject
+)
+import metrics
+from content_hash import compute_content_hash
+from cpf_index import CPFIndex, extract_cpf
 from logger import get_logger
+from metadata_index import MERGED, UPLOADED, MOVED
+from pipeline import Stage, StagedPipeline
+from run_stats import RunStats
+from config import (
+    PIPELINE_ENABLED,
+    PIPELINE_DOWNLOAD_WORKERS,
+    PIPELINE_MERGE_WORKERS,
+    PIPELINE_UPLOAD_WORKERS,
+    PIPELINE_MOVE_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    MOVE_FLUSH_GROUPS,
+    MERGE_KEEP_ANNOTATIONS,
+    MERGE_DEDUP_RESOURCES,
+    MERGE_COMPRESS_STREAMS,
+    MERGE_USE_PROCESSES,
+    MERGE_PROCESS_WORKERS,
+    SERVER_WORKERS
+)
 
 logger = get_logger()
 
+# Dicionários de recursos que podem ser compartilhados entre páginas sem alterar o documento
+_SHAREABLE_TYPES = ("/Font", "/FontDescriptor", "/ExtGState", "/Encoding")
+
+
+def _stream_size(file_obj):
+    """
+    Retorna o tamanho em bytes de um arquivo aberto, preservando a posição atual.
+    """
+    position = file_obj.tell()
+    file_obj.seek(0, os.SEEK_END)
+    size = file_obj.tell()
+    file_obj.seek(position)
+    return size
+
+
+def _object_key(obj):
+    """
+    Chave de conteúdo de um objeto do PdfWriter para deduplicação, ou None se o
+    objeto não puder ser compartilhado.
+    """
+    if not isinstance(obj, dict):
+        return None
+    if isinstance(obj, StreamObject):
+        data = obj._data
+    elif obj.get("/Type") in _SHAREABLE_TYPES:
+        data = None
+    else:
+        return None
+
+    buffer = io.BytesIO()
+    for key in sorted(obj.keys()):
+        if key == "/Length":
+            continue
+        buffer.write(key.encode() + b" ")
+        obj[key].write_to_stream(buffer, None)
+        buffer.write(b"\n")
+    return (type(obj).__name__, data, buffer.getvalue())
+
+
+def _remap_references(obj, remap):
+    """
+    Substitui, dentro de obj, referências aos objetos duplicados pelas do objeto mantido.
+
+    Returns:
+        bool: True se alguma referência foi substituída
+    """
+    # Objetos do PyPDF2 herdam de um Protocol, o que torna isinstance lento nessas
+    # classes; dict e list (bases de DictionaryObject e ArrayObject) são verificados
+    # diretamente
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return False
+
+    changed = False
+    for key, value in list(items):
+        if type(value) is IndirectObject:
+            if value.idnum in remap:
+                obj[key] = IndirectObject(remap[value.idnum], 0, value.pdf)
+                changed = True
+        elif _remap_references(value, remap):
+            changed = True
+    return changed
+
+
+def _dedup_objects(writer):
+    """
+    Mantém uma única cópia de streams (fontes, imagens, perfis ICC) e dicionários
+    de recursos idênticos vindos de PDFs diferentes.
+
+    As cópias removidas viram NullObject para não alterar a numeração dos objetos.
+    Repete até não haver mais duplicatas, pois unir streams pode tornar idênticos
+    os dicionários que os referenciam (ex.: FontDescriptor -> Font); a cada rodada
+    só são reavaliados os objetos cujas referências mudaram.
+
+    Returns:
+        int: Número de objetos removidos
+    """
+    objects = writer._objects
+    canonical = {}
+    pending = range(len(objects))
+    removed = 0
+    while True:
+        remap = {}
+        for index in pending:
+            key = _object_key(objects[index])
+            if key is None:
+                continue
+            idnum = index + 1
+            kept = canonical.setdefault(key, idnum)
+            if kept != idnum:
+                remap[idnum] = kept
+
+        if not remap:
+            return removed
+
+        for idnum in remap:
+            objects[idnum - 1] = NullObject()
+        pending = [index for index, obj in enumerate(objects) if _remap_references(obj, remap)]
+        removed += len(remap)
+
+
+def _compress_streams(writer):
+    """
+    Comprime com FlateDecode os streams do PdfWriter que ainda não têm filtro.
+    """
+    for index, obj in enumerate(writer._objects):
+        if not isinstance(obj, StreamObject) or "/Filter" in obj or not obj._data:
+            continue
+        compressed = EncodedStreamObject()
+        for key, value in obj.items():
+            if key != "/Length":
+                compressed[key] = value
+        compressed[NameObject("/Filter")] = NameObject("/FlateDecode")
+        compressed._data = FlateDecode.encode(obj._data)
+        writer._objects[index] = compressed
+
+
+def _build_merged_writer(pdf_files):
+    """
+    Adiciona as páginas de todos os PDFs a um PdfWriter, aplicando as otimizações
+    configuradas (sem anotações, deduplicação de recursos e compressão).
+
+    Args:
+        pdf_files (list): Arquivos PDF abertos em modo binário
+
+    Returns:
+        PdfWriter: Documento unido, pronto para ser gravado
+    """
+    logger.info(f"Unindo {len(pdf_files)} arquivos PDF")
+    
+    merger = PdfWriter()
+    
+    # Anotações (links, comentários) não são necessárias nos comprovantes unidos
+    excluded_keys = () if MERGE_KEEP_ANNOTATIONS else ("/Annots",)
+    
+    # O PdfWriter identifica objetos já copiados por id(reader): os readers precisam
+    # continuar vivos até o fim, senão um novo reader pode reaproveitar o id de um
+    # anterior e receber objetos do arquivo errado
+    readers = []
+    
+    # Adiciona cada PDF ao merger
+    for pdf_file in pdf_files:
+        try:
+            reader = PdfReader(pdf_file)
+            readers.append(reader)
+            if len(reader.pages) > 0:
+                for page in reader.pages:
+                    merger.add_page(page, excluded_keys)
+            else:
+                logger.warning(f"PDF sem páginas detectado")
+        except Exception as e:
+            logger.error(f"Erro ao ler PDF: {str(e)}")
+            # Continua tentando unir os PDFs restantes
+            continue
+        finally:
+            # Retorna ao início do arquivo para futuras operações
+            if hasattr(pdf_file, 'seek'):
+                pdf_file.seek(0)
+    
+    if MERGE_DEDUP_RESOURCES:
+        removed = _dedup_objects(merger)
+        if removed:
+            logger.info(f"{removed} recursos duplicados removidos do PDF unido")
+    if MERGE_COMPRESS_STREAMS:
+        _compress_streams(merger)
+    
+    return merger
+
+
+def merge_pdf_files(input_paths, output_path):
+    """
+    Une PDFs a partir de caminhos em disco e grava o resultado em output_path.
+
+    Executada nos processos de merge: apenas os caminhos trafegam entre processos,
+    nunca o conteúdo dos PDFs.
+
+    Args:
+        input_paths (list): Caminhos dos PDFs de entrada, na ordem de união
+        output_path (str): Caminho do PDF unido a ser gravado
+    """
+    pdf_files = [open(path, 'rb') for path in input_paths]
+    try:
+        merger = _build_merged_writer(pdf_files)
+        with open(output_path, 'wb') as output:
+            merger.write(output)
+    finally:
+        for pdf_file in pdf_files:
+            pdf_file.close()
+
+
+def _merge_process_count():
+    """
+    Processos do pool de merge deste processo. Cada worker do gunicorn tem seu
+    próprio pool, então por padrão os núcleos são divididos entre os
+    SERVER_WORKERS workers (o Waitress, no Windows, roda em um único processo).
+    """
+    if MERGE_PROCESS_WORKERS:
+        return MERGE_PROCESS_WORKERS
+    server_processes = 1 if os.name == 'nt' else max(1, SERVER_WORKERS)
+    return max(1, (os.cpu_count() or 1) // server_processes)
+
+
+def _file_path(file_obj):
+    """Caminho em disco de um arquivo aberto, ou None se ele não tiver um (ex.: em memória)."""
+    name = getattr(file_obj, 'name', None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    return None
+
+
+class _GroupJob:
+    """
+    Estado de um grupo de arquivos de um mesmo CPF ao longo das etapas de processamento.
+    """
+    
+    def __init__(self, cpf, files):
+        self.cpf = cpf
+        self.files = files    # Lista de FileEntry
+        self.downloaded = []  # Lista de (arquivo temporário, caminho no Dropbox)
+        self.merged = None
+        self.temp_paths = []  # Arquivos em disco criados para o merge em processos
+    
+    @property
+    def size(self):
+        """Tamanho total dos arquivos do grupo, em bytes."""
+        return sum(file.size for file in self.files)
+    
+    def close_downloads(self):
+        """Fecha os arquivos temporários baixados."""
+        for temp_file, _ in self.downloaded:
+            if hasattr(temp_file, 'close'):
+                temp_file.close()
+    
+    def close(self):
+        """Libera todos os recursos do grupo."""
+        self.close_downloads()
+        if self.merged is not None:
+            self.merged.close()
+            self.merged = None
+        for path in self.temp_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.temp_paths = []
+
+
 class PDFProcessor:
     """
     Classe para processar arquivos PDF, incluindo extração de CPF de nomes de arquivos,
     união de PDFs com o mesmo CPF, e interação com o Dropbox.
     """
     
-    def __init__(self, dropbox_handler):
+    def __init__(self, dropbox_handler, metadata_index=None):
         """
         Inicializa o processador de PDF.
         
         Args:
             dropbox_handler: Instância de DropboxHandler para operações com o Dropbox
+            metadata_index: Instância opcional de MetadataIndex, atualizada a cada etapa
         """
         self.dropbox_handler = dropbox_handler
+        self.metadata_index = metadata_index
         self.processed_cpfs = {}  # CPFs processados e quantidade de arquivos
         self.skipped_cpfs = 0     # Contagem de CPFs ignorados
         self.total_files = 0      # Total de arquivos encontrados
+        self._stats_lock = threading.Lock()
+        self._output_folder = None
+        self._processed_folder = None
+        self.skipped_uploads = 0  # PDFs unidos idênticos ao já existente na pasta de saída
+        self._pending_moves = []  # Grupos enviados aguardando a movimentação em lote
+        self._output_hashes = {}  # content_hash dos arquivos da pasta de saída, por nome
+        self._progress = None     # Rastreador de progresso da execução atual
+        self._merge_pool = None   # Pool de processos de merge (MERGE_USE_PROCESSES)
+        self._run_stats = RunStats()  # Tempos, chamadas e bytes da última execução
     
     def extract_cpf_from_filename(self, filename):
         """
@@ -34,19 +328,9 @@ class PDFProcessor:
             filename (str): Nome do arquivo
             
         Returns:
-            str: CPF extraído ou None se não encontrado
+            str: CPF extraído ou None se não encontrado (ou com dígitos verificadores inválidos)
         """
-        # Padrões de CPF: 11 dígitos juntos ou com separadores
-        # 00000000000, 000.000.000-00 ou 000 000 000 00
-        cpf_pattern = r'\b(\d{3}[.\-\s]?\d{3}[.\-\s]?\d{3}[.\-\s]?\d{2}|\d{11})\b'
-        
-        match = re.search(cpf_pattern, filename)
-        if match:
-            # Extrair apenas os dígitos do CPF
-            cpf = ''.join(c for c in match.group(1) if c.isdigit())
-            return cpf
-        
-        return None
+        return extract_cpf(filename)
     
     def merge_pdfs(self, pdf_files):
         """
@@ -58,27 +342,7 @@ class PDFProcessor:
         Returns:
             io.BytesIO: Objeto BytesIO contendo o PDF unido
         """
-        logger.info(f"Unindo {len(pdf_files)} arquivos PDF")
-        
-        merger = PdfWriter()
-        
-        # Adiciona cada PDF ao merger
-        for pdf_file in pdf_files:
-            try:
-                reader = PdfReader(pdf_file)
-                if len(reader.pages) > 0:
-                    for page in reader.pages:
-                        merger.add_page(page)
-                else:
-                    logger.warning(f"PDF sem páginas detectado")
-            except Exception as e:
-                logger.error(f"Erro ao ler PDF: {str(e)}")
-                # Continua tentando unir os PDFs restantes
-                continue
-            finally:
-                # Retorna ao início do arquivo para futuras operações
-                if hasattr(pdf_file, 'seek'):
-                    pdf_file.seek(0)
+        merger = _build_merged_writer(pdf_files)
         
         # Cria um objeto BytesIO para armazenar o PDF unido
         output = io.BytesIO()
@@ -87,104 +351,418 @@ class PDFProcessor:
         
         return output
     
-    def process_pdfs_from_dropbox(self):
+    def _download_stage(self, job):
+        """
+        Estágio de download: baixa todos os arquivos do grupo.
+        """
+        paths = [file.path for file in job.files]
+        content_hashes = [file.content_hash for file in job.files]
+        results = self.dropbox_handler.download_many(paths, content_hashes=content_hashes)
+        
+        failed = []
+        downloaded_bytes = 0
+        for file_path, (temp_file, error) in zip(paths, results):
+            if error is not None:
+                failed.append(f"{os.path.basename(file_path)} ({str(error)})")
+            else:
+                job.downloaded.append((temp_file, file_path))
+                downloaded_bytes += _stream_size(temp_file)
+        
+        self._count_progress(bytes_downloaded=downloaded_bytes)
+        self._run_stats.add_bytes("download", downloaded_bytes)
+        
+        # O PDF unido precisa de todos os comprovantes do CPF
+        if failed:
+            raise RuntimeError(f"Falha no download de {len(failed)} de {len(paths)} arquivos: {', '.join(failed)}")
+        
+        self._count_progress(stage="download")
+        return job
+    
+    def _merge_stage(self, job):
+        """
+        Estágio de merge: une os PDFs baixados e libera os arquivos temporários.
+        """
+        if MERGE_USE_PROCESSES:
+            job.merged = self._merge_in_process(job)
+        else:
+            job.merged = self.merge_pdfs([f[0] for f in job.downloaded])
+        job.close_downloads()
+        self._run_stats.add_bytes("merge", _stream_size(job.merged))
+        self._set_files_state(job.files, MERGED)
+        self._count_progress(stage="merge")
+        return job
+    
+    def _merge_in_process(self, job):
+        """
+        Une os PDFs do grupo no pool de processos de merge.
+        
+        Entradas e saída trafegam como caminhos de arquivos: downloads que já estão
+        em disco (cache) são usados diretamente e os demais são gravados em arquivos
+        temporários, removidos ao fechar o grupo.
+        
+        Returns:
+            file: PDF unido, aberto para leitura
+        """
+        input_paths = []
+        for temp_file, _ in job.downloaded:
+            path = _file_path(temp_file)
+            if path is None:
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as spilled:
+                    job.temp_paths.append(spilled.name)
+                    temp_file.seek(0)
+                    shutil.copyfileobj(temp_file, spilled)
+                path = spilled.name
+            input_paths.append(path)
+        
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as output:
+            output_path = output.name
+        job.temp_paths.append(output_path)
+        
+        pool = self._get_merge_pool()
+        try:
+            pool.submit(merge_pdf_files, input_paths, output_path).result()
+        except BrokenProcessPool:
+            # Um processo de merge morreu: o próximo grupo recria o pool
+            with self._stats_lock:
+                if self._merge_pool is pool:
+                    self._merge_pool = None
+            raise
+        
+        return open(output_path, 'rb')
+    
+    def _get_merge_pool(self):
+        """
+        Retorna o pool de processos de merge, criando-o na primeira utilização.
+        O pool é reaproveitado entre execuções para não pagar a inicialização de novo.
+        
+        Os processos são criados com spawn e reimportam o módulo principal: o
+        script que inicia o servidor não deve inicializar nada fora do bloco
+        `if __name__ == '__main__'` (veja serve.py).
+        """
+        with self._stats_lock:
+            if self._merge_pool is None:
+                workers = _merge_process_count()
+                self._merge_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"Pool de merge iniciado com {workers} processos")
+            return self._merge_pool
+    
+    def _upload_stage(self, job):
+        """
+        Estágio de upload: envia o PDF unido para a pasta de saída.
+        """
+        merged_filename = f"{job.cpf}_merged.pdf"
+        
+        # Reexecução: o arquivo de saída já existe com o mesmo conteúdo
+        if self._output_hashes.get(merged_filename.lower()) == compute_content_hash(job.merged):
+            logger.info(f"{merged_filename} já está atualizado na pasta de saída. Upload ignorado")
+            with self._stats_lock:
+                self.skipped_uploads += 1
+            self._set_files_state(job.files, UPLOADED)
+            self._count_progress(stage="upload")
+            job.close()
+            return job
+        
+        self.dropbox_handler.upload_file(
+            job.merged,
+            f"{self._output_folder}/{merged_filename}"
+        )
+        uploaded_bytes = _stream_size(job.merged)
+        self._set_files_state(job.files, UPLOADED)
+        self._count_progress(stage="upload", bytes_uploaded=uploaded_bytes)
+        self._run_stats.add_bytes("upload", uploaded_bytes)
+        job.close()
+        return job
+    
+    def _move_stage(self, job):
+        """
+        Estágio de movimentação: acumula o grupo e, a cada MOVE_FLUSH_GROUPS grupos,
+        move os arquivos de origem para a pasta de processados em lote.
+        """
+        with self._stats_lock:
+            self._pending_moves.append(job)
+            if len(self._pending_moves) < MOVE_FLUSH_GROUPS:
+                return None
+            jobs, self._pending_moves = self._pending_moves, []
+        
+        self._move_groups(jobs)
+        return None
+    
+    def _flush_pending_moves(self):
+        """
+        Move os arquivos dos grupos ainda acumulados.
+        """
+        with self._stats_lock:
+            jobs, self._pending_moves = self._pending_moves, []
+        if jobs:
+            self._move_groups(jobs)
+    
+    def _move_groups(self, jobs):
+        """
+        Move os arquivos de origem de vários grupos com uma única chamada em lote
+        e atualiza as estatísticas de cada grupo.
+        """
+        moves = []
+        for job in jobs:
+            for file in job.files:
+                moves.append((file.path, f"{self._processed_folder}/{file.name}"))
+        
+        with self._run_stats.stage("move"):
+            results = self.dropbox_handler.move_many(moves)
+        
+        moved_files = []
+        position = 0
+        for job in jobs:
+            job_results = results[position:position + len(job.files)]
+            position += len(job.files)
+            
+            errors = [error for _, error in job_results if error is not None]
+            if errors:
+                logger.error(f"Erro ao mover {len(errors)} de {len(job.files)} arquivos do CPF {job.cpf}: {str(errors[0])}")
+                with self._stats_lock:
+                    self.skipped_cpfs += 1
+            else:
+                # Adicionar às estatísticas
+                with self._stats_lock:
+                    self.processed_cpfs[job.cpf] = len(job.files)
+                moved_files.extend(job.files)
+                self._count_progress(stage="move")
+            self._count_progress(groups_done=1)
+        
+        self._set_files_state(moved_files, MOVED)
+    
+    def _sync_metadata_index(self, pdf_files, cpf_index):
+        """
+        Atualiza o índice de metadados com a listagem e consulta os CPFs cujo PDF
+        unido já foi enviado (execução anterior interrompida antes da movimentação).
+        
+        Returns:
+            set: CPFs com todos os arquivos em UPLOADED e revisão inalterada (vazio
+                se não houver índice ou ele estiver indisponível)
+        """
+        if self.metadata_index is None:
+            return set()
+        
+        cpf_by_path = {entry.path: cpf for cpf, entries in cpf_index.groups() for entry in entries}
+        try:
+            self.metadata_index.sync_listing(pdf_files, lambda entry: cpf_by_path.get(entry.path))
+            return self.metadata_index.cpfs_in_state(UPLOADED)
+        except Exception as e:
+            logger.warning(f"Índice de metadados indisponível nesta execução: {str(e)}")
+            return set()
+    
+    def _set_files_state(self, files, state):
+        """
+        Registra o estado de processamento dos arquivos no índice de metadados, se houver.
+        """
+        if self.metadata_index is None:
+            return
+        try:
+            self.metadata_index.set_state([file.path for file in files], state)
+        except Exception as e:
+            logger.warning(f"Não foi possível atualizar o índice de metadados: {str(e)}")
+    
+    def _handle_group_error(self, stage_name, job, error):
+        """
+        Registra a falha de um grupo e libera seus recursos.
+        """
+        logger.error(f"Erro ao processar CPF {job.cpf} (etapa {stage_name}): {str(error)}")
+        job.close()
+        with self._stats_lock:
+            self.skipped_cpfs += 1
+        self._count_progress(groups_done=1)
+    
+    def _report_progress(self, **fields):
+        """
+        Atualiza campos do rastreador de progresso da execução atual, se houver.
+        """
+        if self._progress is not None:
+            self._progress.update(**fields)
+    
+    def _count_progress(self, stage=None, **counters):
+        """
+        Incrementa contadores do rastreador de progresso da execução atual, se houver.
+        """
+        if self._progress is not None:
+            self._progress.increment(stage, **counters)
+    
+    def _run_serial(self, jobs):
+        """
+        Processa os grupos um de cada vez, etapa por etapa.
+        """
+        stages = [
+            ("download", self._timed("download", self._download_stage)),
+            ("merge", self._timed("merge", self._merge_stage)),
+            ("upload", self._timed("upload", self._upload_stage)),
+            ("move", self._move_stage),
+        ]
+        for job in jobs:
+            for stage_name, stage in stages:
+                try:
+                    stage(job)
+                except Exception as e:
+                    self._handle_group_error(stage_name, job, e)
+                    # Continuar com outros CPFs
+                    break
+        self._flush_pending_moves()
+    
+    def _timed(self, stage_name, stage):
+        """
+        Envolve um estágio para registrar o tempo de cada chamada em _run_stats.
+        O movimento é medido em _move_groups, onde acontece a chamada em lote.
+        """
+        def timed_stage(job):
+            with self._run_stats.stage(stage_name):
+                return stage(job)
+        return timed_stage
+    
+    def _merge_workers(self):
+        """
+        Threads do estágio de merge: com o pool de processos, uma por processo,
+        para manter todos os processos ocupados.
+        """
+        if MERGE_USE_PROCESSES:
+            return max(PIPELINE_MERGE_WORKERS, _merge_process_count())
+        return PIPELINE_MERGE_WORKERS
+    
+    def _run_pipeline(self, jobs):
+        """
+        Processa os grupos em um pipeline com filas limitadas entre as etapas,
+        sobrepondo chamadas de rede e trabalho de CPU de grupos diferentes.
+        """
+        pipeline = StagedPipeline(
+            [
+                Stage("download", self._timed("download", self._download_stage),
+                      PIPELINE_DOWNLOAD_WORKERS, PIPELINE_QUEUE_SIZE),
+                Stage("merge", self._timed("merge", self._merge_stage),
+                      self._merge_workers(), PIPELINE_QUEUE_SIZE),
+                Stage("upload", self._timed("upload", self._upload_stage),
+                      PIPELINE_UPLOAD_WORKERS, PIPELINE_QUEUE_SIZE),
+                Stage("move", self._move_stage, PIPELINE_MOVE_WORKERS, PIPELINE_QUEUE_SIZE,
+                      on_close=self._flush_pending_moves),
+            ],
+            on_error=self._handle_group_error
+        )
+        pipeline.run(jobs)
+    
+    def process_pdfs_from_dropbox(self, use_pipeline=None, progress=None):
         """
         Processa arquivos PDF do Dropbox.
         
+        Args:
+            use_pipeline (bool): Se True, usa o pipeline concorrente; se False, processa
+                um CPF por vez. Se None, usa PIPELINE_ENABLED do config.py.
+            progress: Rastreador opcional (ex.: jobs.Job) com os métodos update(**campos)
+                e increment(etapa, **contadores), atualizado durante a execução
+        
         Returns:
             bool: True se o processamento foi concluído com sucesso, False caso contrário
         """
+        if use_pipeline is None:
+            use_pipeline = PIPELINE_ENABLED
+        
+        # Tempos por etapa e latência das chamadas ao Dropbox desta execução
+        self._run_stats = RunStats()
+        # Apenas as chamadas da execução: o longpoll e o observador de pasta rodam em paralelo
+        self.dropbox_handler.add_call_listener(self._run_stats.record_call, include_background=False)
+        connections_before = self.dropbox_handler.connection_stats()
+        
         try:
             # Resetar estatísticas
             self.processed_cpfs = {}
             self.skipped_cpfs = 0
             self.total_files = 0
+            self.skipped_uploads = 0
+            self._pending_moves = []
+            self._output_hashes = {}
+            self._progress = progress
             
             # Obter as pastas necessárias
-            source_folder = self.dropbox_handler.get_source_folder_path()
-            output_folder = self.dropbox_handler.get_output_folder_path()
-            processed_folder = self.dropbox_handler.get_processed_folder_path()
+            self._report_progress(stage="folders")
+            with self._run_stats.stage("folders"):
+                source_folder = self.dropbox_handler.get_source_folder_path()
+                output_folder = self.dropbox_handler.get_output_folder_path()
+                processed_folder = self.dropbox_handler.get_processed_folder_path()
             
             if not source_folder or not output_folder or not processed_folder:
                 logger.error("Falha ao configurar pastas necessárias do Dropbox")
                 return False
             
+            self._output_folder = output_folder
+            self._processed_folder = processed_folder
+            
+            # Hashes dos PDFs já unidos, para não reenviar arquivos idênticos
+            with self._run_stats.stage("output_hashes"):
+                try:
+                    self._output_hashes = self.dropbox_handler.get_content_hashes(output_folder)
+                except Exception as e:
+                    logger.warning(f"Não foi possível obter os arquivos da pasta de saída: {str(e)}")
+            
             # Obter lista de arquivos PDF
-            pdf_files = self.dropbox_handler.list_files()
+            self._report_progress(stage="listing")
+            with self._run_stats.stage("listing"):
+                pdf_files = self.dropbox_handler.list_files()
             self.total_files = len(pdf_files)
             
             logger.info(f"Total de arquivos PDF encontrados: {self.total_files}")
             
+            # Agrupar arquivos por CPF
+            with self._run_stats.stage("grouping"):
+                cpf_index = CPFIndex(pdf_files)
+                uploaded_cpfs = self._sync_metadata_index(pdf_files, cpf_index)
+            
             if not pdf_files:
                 logger.info("Nenhum arquivo encontrado para processamento")
                 return True
             
-            # Agrupar arquivos por CPF
-            cpf_groups = {}
-            for pdf_file in pdf_files:
-                filename = os.path.basename(pdf_file['path_display'])
-                cpf = self.extract_cpf_from_filename(filename)
-                
-                if cpf:
-                    if cpf not in cpf_groups:
-                        cpf_groups[cpf] = []
-                    cpf_groups[cpf].append(pdf_file)
-            
-            logger.info(f"Total de CPFs identificados: {len(cpf_groups)}")
-            
-            # Processar cada grupo de arquivos
-            for cpf, files in cpf_groups.items():
-                # Processar apenas CPFs com múltiplos arquivos
-                if len(files) > 1:
-                    # Download de todos os arquivos
-                    downloaded_files = []
-                    try:
-                        for file in files:
-                            file_path = file['path_display']
-                            temp_file = self.dropbox_handler.download_file(file_path)
-                            downloaded_files.append((temp_file, file_path))
-                        
-                        # Unir PDFs
-                        if downloaded_files:
-                            # Criar arquivo unido
-                            merged_pdf = self.merge_pdfs([f[0] for f in downloaded_files])
-                            
-                            # Upload do arquivo unido
-                            merged_filename = f"{cpf}_merged.pdf"
-                            self.dropbox_handler.upload_file(
-                                merged_pdf, 
-                                f"{output_folder}/{merged_filename}"
-                            )
-                            
-                            # Mover arquivos processados
-                            for _, file_path in downloaded_files:
-                                filename = os.path.basename(file_path)
-                                self.dropbox_handler.move_file(
-                                    file_path, 
-                                    f"{processed_folder}/{filename}"
-                                )
-                            
-                            # Adicionar às estatísticas
-                            self.processed_cpfs[cpf] = len(files)
-                            
-                            # Limpeza de arquivos temporários
-                            merged_pdf.close()
-                            for temp_file, _ in downloaded_files:
-                                if hasattr(temp_file, 'close'):
-                                    temp_file.close()
-                    except Exception as e:
-                        logger.error(f"Erro ao processar CPF {cpf}: {str(e)}")
-                        self.skipped_cpfs += 1
-                        # Continuar com outros CPFs
-                else:
-                    # CPF com apenas um arquivo: ignorar
+            logger.info(f"Total de CPFs identificados: {len(cpf_index)}")
+            if cpf_index.unmatched:
+                logger.info(f"Arquivos sem CPF válido no nome: {cpf_index.unmatched}")
+            
+            # Processar apenas CPFs com múltiplos arquivos; CPF com apenas um arquivo: ignorar
+            jobs = []
+            uploaded_jobs = []
+            for cpf, files in cpf_index.groups():
+                if len(files) <= 1:
                     self.skipped_cpfs += 1
+                elif cpf in uploaded_cpfs and f"{cpf}_merged.pdf".lower() in self._output_hashes:
+                    # PDF unido já enviado e comprovantes inalterados: falta apenas mover
+                    uploaded_jobs.append(_GroupJob(cpf, files))
+                else:
+                    jobs.append(_GroupJob(cpf, files))
+            if uploaded_jobs:
+                logger.info(f"CPFs já enviados em execução anterior, apenas movidos: {len(uploaded_jobs)}")
+            
+            # Maiores grupos primeiro: evita que um grupo grande fique sozinho no fim do pipeline
+            jobs.sort(key=lambda job: job.size, reverse=True)
+            
+            self._report_progress(stage="processing", groups_total=len(jobs) + len(uploaded_jobs))
+            for job in uploaded_jobs:
+                with self._stats_lock:
+                    self.skipped_uploads += 1
+                try:
+                    self._move_stage(job)
+                except Exception as e:
+                    self._handle_group_error("move", job, e)
+            if use_pipeline:
+                self._run_pipeline(jobs)
+            else:
+                self._run_serial(jobs)
+            self._flush_pending_moves()
             
             return True
             
         except Exception as e:
             logger.error(f"Erro ao processar PDFs: {str(e)}")
             return False
+        finally:
+            self.dropbox_handler.remove_call_listener(self._run_stats.record_call)
+            self._run_stats.record_connections(connections_before, self.dropbox_handler.connection_stats())
+            self._run_stats.finish()
+            # As métricas da execução ficam visíveis em /metrics de qualquer worker
+            metrics.flush()
     
     def get_processing_stats(self):
         """
@@ -200,6 +778,8 @@ class PDFProcessor:
             "success": True,
             "processed_cpfs": self.processed_cpfs,
             "skipped_cpfs": self.skipped_cpfs,
+            "skipped_uploads": self.skipped_uploads,
             "total_processed": total_processed_files,
-            "total_files": self.total_files
+            "total_files": self.total_files,
+            "timings": self._run_stats.to_dict()
         }
@@ -0,0 +1,113 @@
+import queue
+import threading
+from logger import get_logger
+
+logger = get_logger()
+
+# Marcador de fim de fila enviado a cada worker de um estágio
+_STOP = object()
+
+
+class Stage:
+    """
+    Estágio do pipeline: uma função aplicada a cada item por um número fixo de workers.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=4, on_close=None):
+        """
+        Inicializa o estágio.
+
+        Args:
+            name (str): Nome do estágio (usado nos logs)
+            func (callable): Função que recebe um item e retorna o item para o próximo
+                estágio, ou None para descartá-lo
+            workers (int): Número de threads do estágio
+            queue_size (int): Capacidade da fila de entrada do estágio (backpressure)
+            on_close (callable): Chamada uma única vez quando todos os workers terminam
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.on_close = on_close
+
+
+class StagedPipeline:
+    """
+    Executa uma sequência de estágios ligados por filas limitadas.
+
+    Cada estágio roda em suas próprias threads; quando a fila de um estágio enche,
+    o estágio anterior bloqueia, de modo que o tempo total tende ao do estágio mais lento.
+    """
+
+    def __init__(self, stages, on_error=None):
+        """
+        Args:
+            stages (list): Lista de objetos Stage, na ordem de execução
+            on_error (callable): Chamada com (nome_do_estagio, item, exceção) quando um
+                estágio falha; o item é descartado e o pipeline continua
+        """
+        self.stages = stages
+        self.on_error = on_error
+
+    def _worker(self, stage, inbox, outbox):
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                return
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                self._handle_error(stage, item, e)
+                continue
+            if result is not None and outbox is not None:
+                outbox.put(result)
+
+    def _handle_error(self, stage, item, error):
+        if self.on_error:
+            try:
+                self.on_error(stage.name, item, error)
+            except Exception as callback_error:
+                logger.error(f"Erro no tratamento de falha do estágio {stage.name}: {str(callback_error)}")
+        else:
+            logger.error(f"Erro no estágio {stage.name}: {str(error)}")
+
+    def run(self, items):
+        """
+        Alimenta o pipeline com os itens e bloqueia até que todos os estágios terminem.
+
+        Args:
+            items (iterable): Itens de entrada do primeiro estágio
+        """
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        threads = []
+
+        for index, stage in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            stage_threads = []
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, queues[index], outbox),
+                    name=f"pipeline-{stage.name}-{number}",
+                    daemon=True
+                )
+                thread.start()
+                stage_threads.append(thread)
+            threads.append(stage_threads)
+
+        # put() bloqueia quando a fila do primeiro estágio está cheia (backpressure)
+        for item in items:
+            queues[0].put(item)
+
+        # Encerra os estágios em ordem: só sinaliza o próximo depois que o atual esvaziou
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                queues[index].put(_STOP)
+            for thread in threads[index]:
+                thread.join()
+            if stage.on_close:
+                try:
+                    stage.on_close()
+                except Exception as e:
+                    logger.error(f"Erro ao finalizar estágio {stage.name}: {str(e)}")
@@ -0,0 +1,215 @@
+import os
+import json
+import math
+import time
+import threading
+from datetime import datetime
+from locks import FileLock
+from logger import get_logger
+from config import RUN_HISTORY_FILE, RUN_HISTORY_SIZE
+
+logger = get_logger()
+
+
+def _percentile(sorted_values, fraction):
+    """Percentil (método nearest-rank) de uma lista já ordenada e não vazia."""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class RunStats:
+    """
+    Medições de uma execução: tempo, chamadas e bytes por etapa e latência de
+    cada operação da API do Dropbox.
+
+    As etapas do pipeline rodam em paralelo, então cada etapa registra o tempo de
+    parede (do primeiro início ao último fim) e o tempo ocupado (soma das chamadas).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._finished = None
+        self._stages = {}
+        self._operations = {}
+        self._connections = {}
+
+    def stage(self, name):
+        """
+        Context manager que mede uma chamada da etapa.
+
+        Exemplo:
+            with run_stats.stage("listing"):
+                ...
+        """
+        return _StageTimer(self, name)
+
+    def _get_stage(self, name):
+        """Contadores de uma etapa, criados no primeiro uso. Chamar com _lock adquirido."""
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = {
+                'first_start': None, 'last_end': None, 'busy': 0.0, 'calls': 0, 'bytes': 0
+            }
+        return stage
+
+    def _record_stage(self, name, start, end):
+        with self._lock:
+            stage = self._get_stage(name)
+            if stage['first_start'] is None or start < stage['first_start']:
+                stage['first_start'] = start
+            if stage['last_end'] is None or end > stage['last_end']:
+                stage['last_end'] = end
+            stage['busy'] += end - start
+            stage['calls'] += 1
+
+    def add_bytes(self, name, count):
+        """Soma bytes transferidos ou gerados por uma etapa."""
+        with self._lock:
+            self._get_stage(name)['bytes'] += count
+
+    def record_call(self, operation, seconds, error=None):
+        """
+        Registra uma chamada à API do Dropbox. Compatível com
+        DropboxHandler.add_call_listener.
+        """
+        with self._lock:
+            op = self._operations.setdefault(operation, {'latencies': [], 'errors': 0})
+            op['latencies'].append(seconds)
+            if error is not None:
+                op['errors'] += 1
+
+    def record_connections(self, before, after):
+        """
+        Registra o reaproveitamento de conexões HTTP durante a execução.
+
+        Args:
+            before (dict): DropboxHandler.connection_stats() no início da execução
+            after (dict): DropboxHandler.connection_stats() no fim da execução
+        """
+        connections = {}
+        for host, counts in after.items():
+            start = before.get(host, {})
+            requests = counts['requests'] - start.get('requests', 0)
+            opened = counts['connections'] - start.get('connections', 0)
+            if requests > 0:
+                connections[host] = {
+                    'requests': requests,
+                    'new_connections': opened,
+                    'reuse_ratio': round(1 - min(opened, requests) / requests, 4)
+                }
+        with self._lock:
+            self._connections = connections
+
+    def finish(self):
+        """Marca o fim da execução."""
+        self._finished = time.perf_counter()
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: total_seconds, stages (wall_seconds, busy_seconds, calls, bytes),
+                dropbox (calls, errors, p50_ms, p95_ms por operação) e connections
+                (requests, new_connections, reuse_ratio por host)
+        """
+        with self._lock:
+            end = self._finished or time.perf_counter()
+            stages = {}
+            for name, stage in self._stages.items():
+                wall = 0.0
+                if stage['first_start'] is not None:
+                    wall = stage['last_end'] - stage['first_start']
+                stages[name] = {
+                    'wall_seconds': round(wall, 3),
+                    'busy_seconds': round(stage['busy'], 3),
+                    'calls': stage['calls'],
+                    'bytes': stage['bytes']
+                }
+
+            operations = {}
+            for name, op in self._operations.items():
+                latencies = sorted(op['latencies'])
+                operations[name] = {
+                    'calls': len(latencies),
+                    'errors': op['errors'],
+                    'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1),
+                    'p95_ms': round(_percentile(latencies, 0.95) * 1000, 1)
+                }
+
+        return {
+            'total_seconds': round(end - self._started, 3),
+            'stages': stages,
+            'dropbox': operations,
+            'connections': dict(self._connections)
+        }
+
+
+class _StageTimer:
+    def __init__(self, run_stats, name):
+        self.run_stats = run_stats
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.run_stats._record_stage(self.name, self.start, time.perf_counter())
+        return False
+
+
+class RunHistory:
+    """
+    Histórico das execuções mais recentes, gravado em RUN_HISTORY_FILE e
+    compartilhado entre os workers (acesso protegido por FileLock).
+    """
+
+    def __init__(self, path=None, max_runs=None):
+        """
+        Args:
+            path (str): Arquivo JSON do histórico (padrão: RUN_HISTORY_FILE)
+            max_runs (int): Execuções mantidas (padrão: RUN_HISTORY_SIZE)
+        """
+        self.path = path or RUN_HISTORY_FILE
+        self.max_runs = RUN_HISTORY_SIZE if max_runs is None else max_runs
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except ValueError as e:
+            logger.warning(f"Histórico de execuções ilegível em {self.path}: {str(e)}")
+            return []
+
+    def append(self, record):
+        """
+        Adiciona uma execução, descartando as mais antigas além de max_runs.
+
+        Args:
+            record (dict): Dados da execução (serializáveis em JSON)
+        """
+        record = dict(record)
+        record.setdefault('recorded_at', datetime.now().isoformat(timespec='seconds'))
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with FileLock(f"{self.path}.lock"):
+                runs = self._read()
+                runs.append(record)
+                runs = runs[-self.max_runs:]
+                temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(runs, f)
+                os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o histórico de execuções: {str(e)}")
+
+    def recent(self, limit=None):
+        """
+        Returns:
+            list: Execuções mais recentes primeiro
+        """
+        runs = list(reversed(self._read()))
+        return runs[:limit] if limit else runs
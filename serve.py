@@ -1,38 +1,121 @@
 """
 Servidor de produção universal - funciona no Windows E Linux
+
+No Linux/Mac o Gunicorn é iniciado neste mesmo processo (sem subprocesso), com as
+opções SERVER_* de config.py: workers "gthread" (várias requisições por worker, de
+modo que processamentos longos e clientes de /stream-logs não bloqueiam os demais),
+preload, timeouts e restart gracioso (kill -HUP no processo principal).
+
+Com SERVER_PRELOAD, o processo principal inicializa o Dropbox uma única vez antes de
+criar os workers, que herdam o resultado. Sem preload (ou se essa inicialização
+falhar), cada worker inicializa em segundo plano e /ready indica quando terminou.
+
+Nada é inicializado fora do bloco `if __name__ == '__main__'`: os processos de merge
+(MERGE_USE_PROCESSES) são criados com spawn e reimportam este módulo.
 """
 
 import os
 import sys
 import platform
 from dotenv import load_dotenv
-from app import app, init_dropbox, init_pdf_processor
+from app import app, ensure_initialized, start_background_init, before_fork, after_fork
 from logger import get_logger
+from config import (
+    SERVER_WORKERS,
+    SERVER_WORKER_CLASS,
+    SERVER_THREADS,
+    SERVER_PRELOAD,
+    SERVER_TIMEOUT,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_KEEPALIVE,
+    SERVER_MAX_REQUESTS,
+    SERVER_MAX_REQUESTS_JITTER,
+    WAITRESS_THREADS
+)
 
 # Configuração
 load_dotenv()
 logger = get_logger()
 PORT = int(os.environ.get('PORT', 5000))
 
-# Inicializar componentes
-logger.info("Inicializando componentes...")
-if not init_dropbox() or not init_pdf_processor():
-    logger.error("FALHA na inicialização! Abortando.")
-    sys.exit(1)
-logger.info("Inicialização concluída com sucesso!")
+
+def _when_ready(server):
+    """Processo principal do Gunicorn pronto, antes de criar os workers."""
+    if not server.cfg.preload_app:
+        return
+    # As pastas validadas e o access token ficam em .state/ e são herdados pelos workers
+    logger.info("Inicializando componentes antes de criar os workers...")
+    error = ensure_initialized()
+    if error:
+        logger.error(f"{error}. Os workers tentarão novamente em segundo plano")
+
+
+def _pre_fork(server, worker):
+    before_fork()
+
+
+def _post_fork(server, worker):
+    after_fork()
+
+
+def gunicorn_options():
+    """
+    Opções do Gunicorn a partir de config.py.
+
+    Returns:
+        dict: Nome da configuração do Gunicorn -> valor
+    """
+    return {
+        'bind': f'0.0.0.0:{PORT}',
+        'workers': SERVER_WORKERS,
+        'worker_class': SERVER_WORKER_CLASS,
+        'threads': SERVER_THREADS,
+        'preload_app': SERVER_PRELOAD,
+        'timeout': SERVER_TIMEOUT,
+        'graceful_timeout': SERVER_GRACEFUL_TIMEOUT,
+        'keepalive': SERVER_KEEPALIVE,
+        'max_requests': SERVER_MAX_REQUESTS,
+        'max_requests_jitter': SERVER_MAX_REQUESTS_JITTER,
+        'when_ready': _when_ready,
+        'pre_fork': _pre_fork,
+        'post_fork': _post_fork,
+    }
+
+
+def run_gunicorn():
+    """Inicia o Gunicorn com o app já importado e as opções de gunicorn_options()."""
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornServer(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for name, value in self.options.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            return self.application
+
+    GunicornServer(app, gunicorn_options()).run()
+
 
 if __name__ == '__main__':
     sistema = platform.system()
-    
+
     # Detectar automaticamente o sistema
     if sistema == "Windows":
-        # Usar Waitress no Windows
+        # Usar Waitress no Windows (processo único: inicialização em segundo plano)
         try:
             from waitress import serve
-            logger.info(f"Iniciando servidor Waitress na porta {PORT}")
+            logger.info("Inicializando componentes em segundo plano...")
+            start_background_init()
+            logger.info(f"Iniciando servidor Waitress na porta {PORT} com {WAITRESS_THREADS} threads")
             print(f"Servidor rodando em http://localhost:{PORT}")
             print("Pressione Ctrl+C para encerrar.")
-            serve(app, host='0.0.0.0', port=PORT, threads=1)
+            serve(app, host='0.0.0.0', port=PORT, threads=WAITRESS_THREADS)
         except ImportError:
             print("Erro: Waitress não está instalado. Instale com 'pip install waitress'")
             sys.exit(1)
@@ -40,10 +123,13 @@ if __name__ == '__main__':
         # Usar Gunicorn no Linux/Mac
         try:
             import gunicorn
-            logger.info(f"Iniciando Gunicorn na porta {PORT}")
-            print(f"Servidor rodando em http://localhost:{PORT}")
-            print("Usando Gunicorn. Pressione Ctrl+C para encerrar.")
-            os.system(f"gunicorn -w 4 -b 0.0.0.0:{PORT} app:app")
         except ImportError:
             print("Erro: Gunicorn não está instalado. Instale com 'pip install gunicorn'")
-            sys.exit(1)
\ No newline at end of file
+            sys.exit(1)
+        logger.info(
+            f"Iniciando Gunicorn na porta {PORT}: {SERVER_WORKERS} workers {SERVER_WORKER_CLASS} "
+            f"x {SERVER_THREADS} threads, preload={'sim' if SERVER_PRELOAD else 'não'}"
+        )
+        print(f"Servidor rodando em http://localhost:{PORT}")
+        print("Usando Gunicorn. Pressione Ctrl+C para encerrar.")
+        run_gunicorn()
@@ -0,0 +1,4 @@
+import logging
+
+# Os testes não gravam em workspace.log: get_logger só configura o logger se ele não tiver handlers
+logging.getLogger("pdf_processor").addHandler(logging.NullHandler())
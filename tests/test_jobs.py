@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import JobManager, SUCCEEDED
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Arquivos de estado e de lock em uma pasta temporária por teste."""
+    monkeypatch.setattr(jobs, 'JOBS_DIR', str(tmp_path / 'jobs'))
+    monkeypatch.setattr(jobs, 'RUN_LOCK_FILE', str(tmp_path / 'run.lock'))
+    monkeypatch.setattr(jobs, 'RUN_STATE_FILE', str(tmp_path / 'run_state.json'))
+    monkeypatch.setattr(jobs, 'RUN_STATE_LOCK_FILE', str(tmp_path / 'run_state.lock'))
+    return tmp_path
+
+
+def _gated_manager():
+    """JobManager cujos jobs só terminam quando o evento retornado for sinalizado."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def run_job(job):
+        started.set()
+        release.wait(10)
+        return {'ok': True}
+
+    return JobManager(run_job, max_workers=2), started, release
+
+
+def _run_in_thread(target):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', target()), daemon=True)
+    thread.start()
+    return thread, result
+
+
+def test_submit_while_job_starts_does_not_deadlock():
+    manager, started, release = _gated_manager()
+
+    # Atrasa a leitura do estado feita por _execute com o lock de arquivo adquirido,
+    # para que um segundo disparo chegue exatamente nesse intervalo
+    original_status_of = manager._status_of
+
+    def slow_status_of(job_id):
+        if threading.current_thread().name.startswith('job'):
+            time.sleep(0.3)
+        return original_status_of(job_id)
+
+    manager._status_of = slow_status_of
+
+    first_id, attached = manager.submit()
+    assert not attached
+    time.sleep(0.1)
+
+    thread, result = _run_in_thread(manager.submit)
+    thread.join(5)
+    assert not thread.is_alive(), "submit travou enquanto o job iniciava"
+    assert started.wait(5), "o job não iniciou"
+
+    release.set()
+    assert manager.wait(first_id, timeout=5)['status'] == SUCCEEDED
+    second_id, _ = result['value']
+    assert manager.wait(second_id, timeout=5)['status'] == SUCCEEDED
+
+
+def test_trigger_during_run_gets_next_slot_and_later_triggers_attach():
+    manager, started, release = _gated_manager()
+
+    active_id, attached = manager.submit()
+    assert not attached
+    assert started.wait(5)
+
+    next_id, attached = manager.submit()
+    assert not attached and next_id != active_id
+
+    attached_id, attached = manager.submit()
+    assert attached and attached_id == next_id
+
+    release.set()
+    assert manager.wait(active_id, timeout=5)['status'] == SUCCEEDED
+    assert manager.wait(next_id, timeout=5)['status'] == SUCCEEDED
+
+
+def test_entry_of_dead_process_is_discarded(state_dir):
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    jobs._write_json(jobs.RUN_STATE_FILE, {
+        'active': {'job_id': 'orphan', 'pid': dead.pid},
+        'next': None
+    })
+
+    manager, _, release = _gated_manager()
+    job_id, attached = manager.submit()
+    release.set()
+
+    assert not attached and job_id != 'orphan'
+    assert manager.wait(job_id, timeout=5)['status'] == SUCCEEDED
+
+
+def test_entry_of_this_process_unknown_to_manager_is_discarded():
+    # Ex.: estado gravado antes de um restart que reutilizou o PID
+    jobs._write_json(jobs.RUN_STATE_FILE, {
+        'active': {'job_id': 'stale', 'pid': os.getpid()},
+        'next': None
+    })
+
+    manager, _, release = _gated_manager()
+    job_id, attached = manager.submit()
+    release.set()
+
+    assert not attached and job_id != 'stale'
+    assert manager.wait(job_id, timeout=5)['status'] == SUCCEEDED
@@ -0,0 +1,39 @@
+import json
+import os
+import time
+
+from metrics import MetricsRegistry
+
+
+def _written_counters(directory):
+    totals = {}
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            for metric, series in json.load(f)['counters'].items():
+                for key, value in series.items():
+                    totals[(metric, key)] = totals.get((metric, key), 0) + value
+    return totals
+
+
+def test_changes_are_written_after_the_process_goes_idle(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path), flush_interval=0.2)
+    for _ in range(3):
+        registry.inc('dropbox_api_requests_total', {'method': 'files_download', 'status': 'ok'})
+    registry.observe('dropbox_api_request_duration_seconds', 0.1, {'method': 'files_download'})
+
+    # Só a primeira chamada coincide com uma gravação; o restante é gravado pela thread
+    time.sleep(0.8)
+
+    assert list(_written_counters(str(tmp_path)).values()) == [3]
+    (name,) = os.listdir(str(tmp_path))
+    with open(os.path.join(str(tmp_path), name), 'r', encoding='utf-8') as f:
+        histograms = json.load(f)['histograms']
+    assert list(histograms['dropbox_api_request_duration_seconds'].values())[0]['count'] == 1
+
+
+def test_file_name_includes_process_start(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path))
+    registry.flush()
+
+    (name,) = os.listdir(str(tmp_path))
+    assert name.startswith(f"metrics_{os.getpid()}_") and name.endswith('.json')
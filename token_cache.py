@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime, timezone
+from locks import FileLock
+from logger import get_logger
+from config import TOKEN_CACHE_FILE, TOKEN_REFRESH_MARGIN
+
+logger = get_logger()
+
+# Endpoint OAuth2 do Dropbox (o mesmo usado por get_refresh_token.py)
+TOKEN_URL = "https://api.dropboxapi.com/oauth2/token"
+
+# Espera (segundos) antes de tentar de novo uma renovação que falhou em segundo plano
+_RETRY_DELAY = 60
+
+# Intervalo mínimo (segundos) entre verificações da thread de renovação
+_MIN_WAIT = 30
+
+
+class AccessToken:
+    """Access token de curta duração e o instante em que expira."""
+
+    __slots__ = ('value', 'expires_at')
+
+    def __init__(self, value, expires_at):
+        """
+        Args:
+            value (str): Access token
+            expires_at (float): Expiração (segundos desde a época, como time.time())
+        """
+        self.value = value
+        self.expires_at = expires_at
+
+    @property
+    def expiration(self):
+        """Expiração como datetime UTC sem fuso, no formato esperado pelo SDK do Dropbox."""
+        return datetime.fromtimestamp(self.expires_at, timezone.utc).replace(tzinfo=None)
+
+    def expires_within(self, seconds):
+        """True se o token expira nos próximos `seconds` segundos."""
+        return self.expires_at - time.time() <= seconds
+
+
+class TokenCache:
+    """
+    Access token do Dropbox compartilhado entre os processos (workers do gunicorn).
+
+    O token fica em TOKEN_CACHE_FILE. Só um processo por vez o renova (FileLock);
+    os demais leem o token renovado do arquivo. Uma thread em segundo plano
+    renova o token TOKEN_REFRESH_MARGIN segundos antes da expiração, de modo que
+    nenhuma chamada à API precise esperar pela renovação.
+    """
+
+    def __init__(self, app_key, app_secret, refresh_token, session, path=None):
+        """
+        Args:
+            app_key (str): App key do Dropbox
+            app_secret (str): App secret do Dropbox
+            refresh_token (str): Refresh token OAuth2
+            session (requests.Session): Sessão HTTP usada na renovação
+            path (str): Arquivo do cache (padrão: TOKEN_CACHE_FILE)
+        """
+        self.app_key = app_key
+        self.app_secret = app_secret
+        self.refresh_token = refresh_token
+        self.session = session
+        self.path = path or TOKEN_CACHE_FILE
+        # Identifica as credenciais sem gravar o refresh token no arquivo
+        self._fingerprint = hashlib.sha256(f"{app_key}:{refresh_token}".encode()).hexdigest()
+        self._token = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+
+    def _read(self):
+        """Conteúdo do arquivo se pertencer a estas credenciais, ou {}."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning(f"Cache de token ilegível em {self.path}: {str(e)}")
+            return {}
+        if data.get('fingerprint') != self._fingerprint:
+            return {}
+        return data
+
+    def _write(self, data):
+        data['fingerprint'] = self._fingerprint
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        # O arquivo contém um access token válido: apenas o dono do processo pode lê-lo
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def _token_from(data):
+        if data.get('access_token') and data.get('expires_at'):
+            return AccessToken(data['access_token'], float(data['expires_at']))
+        return None
+
+    def _request_token(self):
+        """
+        Obtém um novo access token com o refresh token.
+
+        Returns:
+            AccessToken: Token novo
+
+        Raises:
+            RuntimeError: Se o Dropbox recusar a renovação
+        """
+        logger.info("Renovando access token do Dropbox")
+        response = self.session.post(
+            TOKEN_URL,
+            data={
+                'grant_type': 'refresh_token',
+                'refresh_token': self.refresh_token,
+                'client_id': self.app_key,
+                'client_secret': self.app_secret
+            },
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Falha ao renovar access token ({response.status_code}): {response.text[:200]}")
+        content = response.json()
+        return AccessToken(content['access_token'], time.time() + int(content['expires_in']))
+
+    def get(self, min_validity=None):
+        """
+        Retorna um access token válido por pelo menos min_validity segundos,
+        renovando-o se necessário.
+
+        Args:
+            min_validity (float): Validade mínima (padrão: TOKEN_REFRESH_MARGIN)
+
+        Returns:
+            AccessToken: Token atual
+        """
+        if min_validity is None:
+            min_validity = TOKEN_REFRESH_MARGIN
+
+        with self._lock:
+            if self._token is not None and not self._token.expires_within(min_validity):
+                return self._token
+
+            token = self._token_from(self._read())
+            if token is None or token.expires_within(min_validity):
+                with FileLock(f"{self.path}.lock"):
+                    # Outro processo pode ter renovado enquanto esperávamos o lock
+                    data = self._read()
+                    token = self._token_from(data)
+                    if token is None or token.expires_within(min_validity):
+                        token = self._request_token()
+                        data.update(access_token=token.value, expires_at=token.expires_at)
+                        self._write(data)
+            self._token = token
+            return token
+
+    def account_verified(self):
+        """True se a conta destas credenciais já foi verificada por algum processo."""
+        return bool(self._read().get('account_verified'))
+
+    def mark_account_verified(self):
+        """Registra que a conta foi verificada (users_get_current_account)."""
+        try:
+            with FileLock(f"{self.path}.lock"):
+                data = self._read()
+                data['account_verified'] = True
+                self._write(data)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o cache de token: {str(e)}")
+
+    def start_refresher(self, on_refresh):
+        """
+        Inicia a thread que renova o token antes da expiração.
+
+        Pode ser chamada de novo após um fork: a thread só existe no processo
+        que a criou, e uma nova é iniciada no processo atual.
+
+        Args:
+            on_refresh (callable): Chamada com o AccessToken novo a cada renovação
+        """
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            return
+        self._stop.clear()
+        self._thread_pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._refresh_loop,
+            args=(on_refresh,),
+            name="dropbox-token-refresher",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop_refresher(self, timeout=None):
+        """
+        Interrompe a thread de renovação e aguarda seu término, para que nenhuma
+        renovação fique pela metade (ex.: antes de um fork).
+
+        Args:
+            timeout (float): Espera máxima em segundos (None aguarda sem limite)
+        """
+        self._stop.set()
+        thread = self._thread
+        if (thread is not None and thread is not threading.current_thread()
+                and self._thread_pid == os.getpid()):
+            thread.join(timeout)
+
+    def _refresh_loop(self, on_refresh):
+        while not self._stop.is_set():
+            token = self._token
+            if token is None:
+                wait = 0
+            else:
+                # Espalha os workers para que raramente disputem o lock da renovação
+                wait = token.expires_at - time.time() - TOKEN_REFRESH_MARGIN + random.uniform(0, 30)
+                wait = max(wait, _MIN_WAIT)
+            if wait > 0 and self._stop.wait(wait):
+                return
+
+            current = self._token
+            try:
+                # Renova com folga: o token novo precisa durar além da próxima espera
+                token = self.get(min_validity=TOKEN_REFRESH_MARGIN + 60)
+            except Exception as e:
+                logger.warning(f"Falha ao renovar access token em segundo plano: {str(e)}")
+                if self._stop.wait(_RETRY_DELAY):
+                    return
+                continue
+
+            if current is None or token.value != current.value:
+                try:
+                    on_refresh(token)
+                except Exception as e:
+                    logger.warning(f"Falha ao aplicar o access token renovado: {str(e)}")
@@ -0,0 +1,165 @@
+import threading
+import time
+from dropbox.exceptions import ApiError
+from locks import FileLock
+from logger import get_logger
+from config import (
+    WATCHER_DEBOUNCE_SECONDS,
+    WATCHER_MAX_DELAY_SECONDS,
+    WATCHER_LONGPOLL_TIMEOUT,
+    WATCHER_LOCK_FILE,
+    WATCHER_LOCK_RETRY_SECONDS
+)
+
+logger = get_logger()
+
+# Espera após um erro inesperado antes de voltar a observar a pasta
+ERROR_BACKOFF_SECONDS = 30
+
+
+class FolderWatcher:
+    """
+    Observa a pasta de origem com files_list_folder_longpoll e dispara o
+    processamento quando novos PDFs chegam.
+
+    Alterações seguidas são agrupadas: o processamento só é disparado depois de
+    um intervalo sem novos arquivos (debounce), limitado a um atraso máximo.
+    Apenas um processo por máquina observa a pasta (lock em WATCHER_LOCK_FILE); os
+    demais aguardam e assumem a observação se esse processo terminar (ex.: worker
+    reciclado ou substituído em um restart do gunicorn).
+    """
+
+    def __init__(self, dropbox_handler, on_change, debounce=None, max_delay=None, timeout=None):
+        """
+        Args:
+            dropbox_handler: Instância de DropboxHandler
+            on_change (callable): Chamada sem argumentos para executar o processamento;
+                deve retornar False se não puder rodar agora (ex.: já existe um em andamento)
+            debounce (float): Segundos sem novos arquivos antes de disparar
+            max_delay (float): Atraso máximo entre o primeiro arquivo novo e o disparo
+            timeout (int): Timeout do longpoll em segundos (30 a 480)
+        """
+        self.dropbox_handler = dropbox_handler
+        self.on_change = on_change
+        self.debounce = WATCHER_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.max_delay = WATCHER_MAX_DELAY_SECONDS if max_delay is None else max_delay
+        self.timeout = WATCHER_LONGPOLL_TIMEOUT if timeout is None else timeout
+
+        self._lock = FileLock(WATCHER_LOCK_FILE)
+        self._stop = threading.Event()
+        self._thread = None
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        self._first_change = None  # Momento do primeiro arquivo novo ainda não processado
+
+    def start(self):
+        """
+        Inicia a observação em uma thread em segundo plano. Se outro processo já
+        observa a pasta, a thread aguarda o lock e assume quando ele for liberado.
+
+        Returns:
+            bool: True se a thread do observador está rodando neste processo
+        """
+        if self._thread and self._thread.is_alive():
+            return True
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Interrompe a observação e cancela disparos pendentes; o lock é liberado pela thread."""
+        self._stop.set()
+        with self._timer_lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _acquire_lock(self):
+        """
+        Aguarda o lock da observação.
+
+        Returns:
+            bool: True se o lock foi adquirido, False se o observador foi interrompido antes
+        """
+        if self._lock.acquire(blocking=False):
+            return True
+        logger.info("Observador de pasta já está ativo em outro processo; aguardando para assumir")
+        while not self._lock.acquire(blocking=False):
+            if self._stop.wait(WATCHER_LOCK_RETRY_SECONDS):
+                return False
+        return True
+
+    def _run(self):
+        if not self._acquire_lock():
+            return
+        logger.info("Observador de pasta iniciado")
+        try:
+            # As chamadas do observador não entram nas estatísticas de um processamento em andamento
+            with self.dropbox_handler.background_calls():
+                self._observe()
+        finally:
+            self._lock.release()
+
+    def _observe(self):
+        cursor = None
+
+        while not self._stop.is_set():
+            try:
+                if cursor is None:
+                    cursor = self.dropbox_handler.get_latest_cursor()
+
+                changed, backoff = self.dropbox_handler.longpoll(cursor, self.timeout)
+
+                if changed:
+                    cursor, new_files = self.dropbox_handler.list_new_files(cursor)
+                    if new_files:
+                        logger.info(f"Observador: {new_files} novo(s) PDF(s) na pasta de origem")
+                        self._schedule()
+
+                if backoff:
+                    self._stop.wait(backoff)
+
+            except ApiError as e:
+                # Cursor invalidado: recomeça a partir do estado atual da pasta
+                logger.warning(f"Observador: erro da API do Dropbox ({str(e)}). Reiniciando cursor")
+                cursor = None
+                self._stop.wait(ERROR_BACKOFF_SECONDS)
+            except Exception as e:
+                logger.error(f"Observador: erro inesperado: {str(e)}")
+                self._stop.wait(ERROR_BACKOFF_SECONDS)
+
+    def _schedule(self):
+        """
+        (Re)agenda o disparo do processamento para depois do intervalo de debounce.
+        """
+        with self._timer_lock:
+            now = time.monotonic()
+            if self._first_change is None:
+                self._first_change = now
+
+            # Não adia além do atraso máximo desde o primeiro arquivo novo
+            delay = min(self.debounce, max(0, self._first_change + self.max_delay - now))
+
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire(self):
+        with self._timer_lock:
+            self._timer = None
+            self._first_change = None
+
+        if self._stop.is_set():
+            return
+
+        try:
+            logger.info("Observador: disparando processamento")
+            if self.on_change() is False:
+                # Processamento ocupado: tenta novamente após o debounce
+                self._schedule()
+        except Exception as e:
+            logger.error(f"Observador: erro ao executar processamento: {str(e)}")